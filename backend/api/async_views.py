@@ -0,0 +1,42 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.renderers import JSONRenderer
+
+from .mixins import get_reference_cache_keys, set_reference_headers
+
+
+def async_reference_view(viewset, actions):
+    """ Асинхронная обертка для справочников в режиме ASGI.
+
+    Попадания в кэш и ответы 304 отдаются прямо в цикле событий без
+    перехода в поток синхронных представлений. Справочники публичные,
+    поэтому аутентификация для таких ответов не нужна. Промахи и все
+    остальное обрабатывает обычный вьюсет.
+    """
+    sync_view = sync_to_async(viewset.as_view(actions))
+    model = viewset.queryset.model
+    renderer = JSONRenderer()
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            version, etag, cache_key = get_reference_cache_keys(
+                model, request)
+
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=version)
+            if not_modified is not None:
+                return not_modified
+
+            data = cache.get(cache_key)
+            if data is not None:
+                return set_reference_headers(
+                    HttpResponse(renderer.render(data),
+                                 content_type=renderer.media_type),
+                    version, etag)
+
+        return await sync_view(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
@@ -0,0 +1,153 @@
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from rest_framework.authentication import TokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTokenCache:
+    """ Ограниченный LRU-кэш токенов в памяти процесса со сроком жизни. """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+
+            if item is None:
+                return None
+
+            value, expires = item
+
+            if expires < time.monotonic():
+                del self.data[key]
+                return None
+
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + self.timeout)
+            self.data.move_to_end(key)
+
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+
+class SharedTokenCache:
+    """ Кэш токенов в общем бэкенде Django, виден всем процессам. """
+
+    def __init__(self, alias, timeout):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    @staticmethod
+    def make_key(key):
+        return f'auth-token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        return self.cache.get(self.make_key(key))
+
+    def set(self, key, value):
+        self.cache.set(self.make_key(key), value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+
+class TokenCache:
+    """ Кэш токен -> (пользователь, токен) со статистикой попаданий.
+
+    При одном воркере хранит данные в памяти процесса. Если задан
+    TOKEN_CACHE_ALIAS (по умолчанию при GUNICORN_WORKERS > 1), использует
+    указанный кэш Django, тогда сброс записи при выходе или деактивации
+    виден всем процессам.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @cached_property
+    def backend(self):
+        if settings.TOKEN_CACHE_ALIAS:
+            return SharedTokenCache(
+                settings.TOKEN_CACHE_ALIAS, settings.TOKEN_CACHE_TIMEOUT)
+
+        return LocalTokenCache(
+            settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TIMEOUT)
+
+    def get(self, key):
+        value = self.backend.get(key)
+
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            lookups = self.hits + self.misses
+
+        if lookups % settings.TOKEN_CACHE_STATS_INTERVAL == 0:
+            logger.info('Кэш токенов: %s', self.stats())
+
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+        with self.lock:
+            self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+            }
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """ Аутентификация по токену без запроса к базе на каждый вызов.
+
+    Каждому запросу отдаётся копия пользователя, чтобы изменения
+    атрибутов в одном запросе не попадали в другие. Счетчики в копии
+    могут устареть, но save() пользователя их не записывает.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+
+        user, token = credentials
+        return copy.copy(user), token
@@ -16,10 +16,26 @@ MAX_USER_MODEL_FIELD_LENGTH = 150
 
 USERNAME_REGEX = r'^[\w.@+-]+$'
 
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+RECIPE_IMAGE_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
 SHOPPING_CART_FAVORITE_SUCCESS_MESSAGE = 'Рецепт не найден.'
 SHOPPING_CART_NOT_FOUND_MESSAGE = 'Рецепт удален из корзины.'
 SHOPPING_CART_BAD_REQUEST_MESSAGE = 'Рецепт не найден в корзине.'
 
+DEFAULT_SHOPPING_LIST_FORMAT = 'txt'
+SHOPPING_LIST_FORMAT_BAD_REQUEST_MESSAGE = (
+    'Неизвестный формат списка покупок.')
+SHOPPING_LIST_EXPORT_TIMEOUT_MESSAGE = (
+    'Список покупок формируется слишком долго, попробуйте позже.')
+
 
 FAVORITE_NOT_FOUND_MESSAGE = 'Рецепт удален из избранного.'
 FAVORITE_BAD_REQUEST_MESSAGE = (
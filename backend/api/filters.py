@@ -1,18 +1,63 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 from rest_framework import filters as rest_filters
 
-from recipes.models import Recipe
+from recipes.cache import get_reference_version
+from recipes.models import Recipe, RecipeTag, Tag
+from recipes.prefix_index import ingredient_index
+from recipes.search import search_recipes
 
 User = get_user_model()
 
 
+def get_tag_ids_by_slug():
+    """ Словарь slug -> id тегов, кэшируется до изменения тегов. """
+    key = f'tag_ids_by_slug:{get_reference_version(Tag)}'
+    tag_ids = cache.get(key)
+
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, settings.REFERENCE_CACHE_TIMEOUT)
+
+    return tag_ids
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_ids_by_slug()]
+
+
+class TagSlugFilter(filters.MultipleChoiceFilter):
+    """ Фильтр рецептов по slug тегов.
+
+    Допустимые slug берутся из кэша, а рецепты отбираются через EXISTS
+    по таблице RecipeTag, поэтому DISTINCT не нужен.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', get_tag_choices)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+
+        tag_ids = get_tag_ids_by_slug()
+
+        return qs.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'),
+            tag_id__in=[tag_ids[slug] for slug in value if slug in tag_ids],
+        )))
+
+
 class RecipeFilter(filters.FilterSet):
     """ Фильтр для рецептов пользователя. """
     author = filters.ModelChoiceFilter(
         queryset=User.objects.all()
     )
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = TagSlugFilter()
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart',
         label='Is in shopping cart'
@@ -21,10 +66,18 @@ class RecipeFilter(filters.FilterSet):
         method='filter_is_favorited',
         label='Is favorited'
     )
+    search = filters.CharFilter(
+        method='filter_search',
+        label='Search'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_in_shopping_cart', 'is_favorited')
+        fields = ('author', 'tags', 'is_in_shopping_cart', 'is_favorited',
+                  'search')
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
 
     def filter_is_favorited(self, queryset, name, value):
 
@@ -47,3 +100,12 @@ class RecipeFilter(filters.FilterSet):
 class IngredientFilter(rest_filters.SearchFilter):
     """ Фильтр для поиска ингридиентов. """
     search_param = 'name'
+
+    def filter_queryset(self, request, queryset, view):
+        search = request.query_params.get(self.search_param, '').strip()
+
+        if (settings.INGREDIENT_PREFIX_INDEX and search
+                and view.action == 'list'):
+            return ingredient_index.search(search)
+
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,117 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import permissions, status
+from rest_framework.response import Response
+
+from foodgram.db_router import (RequestRouting, choose_replica,
+                                is_pinned_to_primary, pin_to_primary,
+                                request_routing)
+from foodgram.instrumentation import serializer_timing
+from recipes.cache import get_reference_version
+
+
+def get_reference_cache_keys(model, request):
+    """ Версия справочника, ETag и ключ кэша для запроса. """
+    version = get_reference_version(model)
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    etag = quote_etag(f'{version}-{path_hash}')
+    cache_key = f'reference:{model._meta.label_lower}:{version}:{path_hash}'
+
+    return version, etag, cache_key
+
+
+def set_reference_headers(response, version, etag):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(version)
+    return response
+
+
+class CachedReferenceMixin:
+    """ Кэширование справочников с версией, ETag и Last-Modified. """
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        version, etag, cache_key = get_reference_cache_keys(
+            self.queryset.model, request)
+
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=version)
+
+        if not_modified is not None:
+            return not_modified
+
+        data = cache.get(cache_key)
+
+        if data is None:
+            response = handler(request, *args, **kwargs)
+
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+            data = response.data
+            cache.set(cache_key, data, settings.REFERENCE_CACHE_TIMEOUT)
+
+        return set_reference_headers(Response(data), version, etag)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class ReplicaReadMixin:
+    """ Безопасные запросы к вьюсету читают данные с реплик.
+
+    После успешной записи пользователь на время
+    DATABASE_REPLICA_STICKY_SECONDS читает только с основной базы,
+    чтобы не увидеть устаревшие данные из-за отставания реплик.
+    Маршрут запроса доступен в request.db_routing.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        routing = RequestRouting()
+        request.db_routing = routing
+        token = request_routing.set(routing)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            request_routing.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if request.method not in permissions.SAFE_METHODS:
+            return
+
+        routing = request_routing.get()
+        user = request.user
+
+        if user.is_authenticated and is_pinned_to_primary(request, user):
+            routing.pinned = True
+        else:
+            routing.replica = choose_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+
+        if (request.method not in permissions.SAFE_METHODS
+                and response.status_code < status.HTTP_400_BAD_REQUEST
+                and request.user.is_authenticated):
+            pin_to_primary(response, request.user)
+
+        return response
+
+
+class TimedSerializerMixin:
+    """ Время сериализации попадает в метрики запроса. """
+
+    def to_representation(self, instance):
+        with serializer_timing():
+            return super().to_representation(instance)
@@ -1,9 +1,105 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from .constants import PAGINATION_PAGE_SIZE
 
 
 class FoodgramPagination(PageNumberPagination):
-    """ Пагинация для проекта Фудграм. """
+    """ Пагинация для проекта Фудграм.
+
+    По умолчанию постраничная. Если передан параметр cursor, выдача идет
+    по ключу (keyset) без OFFSET и без подсчета общего количества.
+    """
     page_size = PAGINATION_PAGE_SIZE
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('-id',)
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = getattr(view, 'cursor_ordering', self.cursor_ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param], queryset.model)
+
+        if position:
+            queryset = queryset.filter(self.get_seek_filter(position))
+
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.next_position = (
+            [getattr(page[-1], field) for field in self.fields]
+            if self.has_next else None)
+
+        return page
+
+    def get_seek_filter(self, position):
+        """ Условие (a, b) < (x, y) для сортировки по убыванию. """
+        seek = Q()
+
+        for index, field in enumerate(self.fields):
+            lookup = 'lt' if self.ordering[index].startswith('-') else 'gt'
+            condition = Q(**{f'{field}__{lookup}': position[index]})
+
+            for previous, value in zip(self.fields[:index], position):
+                condition &= Q(**{previous: value})
+
+            seek |= condition
+
+        return seek
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(
+            json.dumps(position, default=str).encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        if not cursor:
+            return None
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [model._meta.get_field(field).to_python(value)
+                    for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+
+        if not self.has_next:
+            return None
+
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
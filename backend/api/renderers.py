@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+import signal
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class ShoppingListExportTimeout(Exception):
+    """ Список покупок не успел отрендериться за отведенное время. """
+
+
+def render_with_time_limit(renderer, items, seconds):
+    """ Рендер в процессе пула, прерываемый через seconds секунд.
+
+    future.cancel() не останавливает уже запущенную задачу, поэтому
+    процесс сам прерывает рендер по таймеру и освобождается для
+    следующих запросов. Функция живет здесь, а не в utils, потому что
+    процессы пула импортируют ее без настройки моделей Django.
+    """
+
+    def interrupt(signum, frame):
+        raise ShoppingListExportTimeout
+
+    previous = signal.signal(signal.SIGALRM, interrupt)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        return renderer.render(items)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class ShoppingListContentNegotiation(DefaultContentNegotiation):
+    """ Параметр format выбирает формат файла, а не рендерер DRF. """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ShoppingListRenderer:
+    """ Базовый рендерер списка покупок. """
+    format = None
+    media_type = None
+    streaming = True
+
+    title = 'Список ингредиентов для покупки:'
+
+    @staticmethod
+    def get_line(item):
+        ingredient_name = item.get('ingredient__name')
+        measurement_unit = item.get('ingredient__measurement_unit')
+        tolal_amount = item.get('total_ingredients')
+
+        return (f'{ingredient_name.capitalize()} -- {tolal_amount}'
+                f' {measurement_unit}.')
+
+    def render(self, items):
+        raise NotImplementedError
+
+
+class TxtShoppingListRenderer(ShoppingListRenderer):
+    """ Текстовый список покупок, отдается построчно. """
+    format = 'txt'
+    media_type = 'text/plain'
+
+    def render(self, items):
+        yield f'{self.title}\n\n'
+
+        for item in items:
+            yield f'{self.get_line(item)}\n'
+
+
+class CsvShoppingListRenderer(ShoppingListRenderer):
+    """ Список покупок в CSV, отдается построчно. """
+    format = 'csv'
+    media_type = 'text/csv'
+
+    class Echo:
+        def write(self, value):
+            return value
+
+    def render(self, items):
+        writer = csv.writer(self.Echo())
+
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+
+        for item in items:
+            yield writer.writerow((
+                item.get('ingredient__name'),
+                item.get('ingredient__measurement_unit'),
+                item.get('total_ingredients'),
+            ))
+
+
+class JsonShoppingListRenderer(ShoppingListRenderer):
+    """ Список покупок в JSON. """
+    format = 'json'
+    media_type = 'application/json'
+    streaming = False
+
+    def render(self, items):
+        return json.dumps(
+            [{'name': item.get('ingredient__name'),
+              'measurement_unit': item.get('ingredient__measurement_unit'),
+              'amount': item.get('total_ingredients')}
+             for item in items],
+            ensure_ascii=False,
+        ).encode()
+
+
+class PdfShoppingListRenderer(ShoppingListRenderer):
+    """ Список покупок в PDF. """
+    format = 'pdf'
+    media_type = 'application/pdf'
+    streaming = False
+
+    font_name = 'ShoppingListFont'
+    fallback_font_name = 'Helvetica'
+    font_size = 12
+    line_height = 18
+    margin = 50
+
+    def get_font(self):
+        if self.font_name in pdfmetrics.getRegisteredFontNames():
+            return self.font_name
+
+        try:
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.SHOPPING_LIST_PDF_FONT))
+        except TTFError:
+            return self.fallback_font_name
+
+        return self.font_name
+
+    def render(self, items):
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        _, height = A4
+        font = self.get_font()
+        lines = [self.title, ''] + [self.get_line(item) for item in items]
+
+        y = height - self.margin
+        pdf.setFont(font, self.font_size)
+
+        for line in lines:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(font, self.font_size)
+                y = height - self.margin
+
+            pdf.drawString(self.margin, y, line)
+            y -= self.line_height
+
+        pdf.save()
+
+        return buffer.getvalue()
@@ -1,17 +1,225 @@
+import binascii
+import tempfile
+import uuid
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
 from django.db import transaction
+from PIL import Image, ImageFile
 from rest_framework import exceptions, serializers, validators
-from drf_extra_fields.fields import Base64ImageField
+from rest_framework.settings import api_settings
 
+from foodgram.db.upsert import insert_or_ignore
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            RecipeTag, ShoppingCart, ShoppingListItem, Tag)
+from recipes.shopping_list import update_recipe_in_shopping_lists
 from users.models import CustomUser, Follow
 from .constants import DEFAULT_FOLLOW_RECIPE_LIMIT
+from .mixins import TimedSerializerMixin
 
 User = get_user_model()
 
 
-class CustomUserReadSerializer(serializers.ModelSerializer):
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """ Первичный ключ, разрешаемый одним in_bulk на весь запрос.
+
+    collect_pks достает все ключи этого поля из initial_data корневого
+    сериализатора. Сообщения об ошибках те же, что у
+    PrimaryKeyRelatedField.
+    """
+
+    def __init__(self, collect_pks=None, **kwargs):
+        self.collect_pks = collect_pks
+        super().__init__(**kwargs)
+
+    def get_pk(self, data):
+        if isinstance(data, bool):
+            raise TypeError
+        return self.get_queryset().model._meta.pk.get_prep_value(data)
+
+    def get_bulk_instances(self):
+        cache = self.root.__dict__.setdefault('bulk_related_instances', {})
+        model = self.get_queryset().model
+
+        if model not in cache:
+            pks = set()
+
+            for value in self.collect_pks(self.root.initial_data):
+                try:
+                    pks.add(self.get_pk(value))
+                except (TypeError, ValueError):
+                    pass
+
+            cache[model] = self.get_queryset().in_bulk(pks)
+
+        return cache[model]
+
+    def to_internal_value(self, data):
+        if self.collect_pks is None:
+            return super().to_internal_value(data)
+
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+
+        try:
+            instance = self.get_bulk_instances().get(self.get_pk(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+
+        return instance
+
+
+def collect_ingredient_pks(data):
+    return [ingredient.get('id') for ingredient in data.get('ingredients', [])
+            if isinstance(ingredient, dict)]
+
+
+def collect_tag_pks(data):
+    tags = data.get('tags', [])
+    return tags if isinstance(tags, list) else []
+
+
+class StreamingBase64ImageField(serializers.ImageField):
+    """ Изображение в base64, декодируемое по частям во временный файл.
+
+    Размер проверяется по длине строки до декодирования, разрешение - по
+    заголовку изображения после первых декодированных частей.
+    """
+    CHUNK_SIZE = 64 * 1024
+    ALLOWED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif',
+                       'WEBP': 'webp'}
+
+    default_error_messages = {
+        'invalid_base64': 'Некорректное изображение в base64.',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+        'too_big_dimensions': ('Разрешение изображения не должно превышать '
+                               '{max_width}x{max_height}.'),
+    }
+
+    WHITESPACE = ' \t\r\n'
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str) or not data:
+            self.fail('invalid_base64')
+
+        # Строка может весить мегабайты, поэтому границы base64 ищутся по
+        # индексам, а копии делаются только для отдельных частей.
+        start = 0
+        if data.startswith('data:'):
+            try:
+                start = data.index(',') + 1
+            except ValueError:
+                self.fail('invalid_base64')
+
+        end = len(data)
+        while end > start and data[end - 1] in self.WHITESPACE:
+            end -= 1
+
+        padding = 0
+        while end - padding > start and data[end - padding - 1] == '=':
+            padding += 1
+
+        size = end - start - sum(data.count(char, start, end)
+                                 for char in self.WHITESPACE)
+        if size * 3 // 4 - padding > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+
+        file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+
+        try:
+            extension = self.decode_to_file(
+                self.iter_chunks(data, start, end), file)
+        except BaseException:
+            file.close()
+            raise
+
+        file.seek(0)
+        return File(file, name=f'{uuid.uuid4()}.{extension}')
+
+    def iter_chunks(self, data, start, end):
+        """ Части data[start:end] без пробельных символов, кратные 4. """
+        remainder = ''
+
+        for position in range(start, end, self.CHUNK_SIZE):
+            chunk = remainder + ''.join(
+                data[position:min(position + self.CHUNK_SIZE, end)].split())
+            aligned = len(chunk) - len(chunk) % 4
+            remainder = chunk[aligned:]
+            if aligned:
+                yield chunk[:aligned]
+
+        if remainder:
+            yield remainder
+
+    def decode_to_file(self, chunks, file):
+        """ Декодирует части в файл и возвращает расширение изображения. """
+        parser = ImageFile.Parser()
+        header_checked = False
+
+        try:
+            for chunk in chunks:
+                decoded = binascii.a2b_base64(chunk)
+                file.write(decoded)
+
+                if not header_checked:
+                    parser.feed(decoded)
+                    if parser.image is not None:
+                        self.check_header(parser.image)
+                        header_checked = True
+        except binascii.Error:
+            self.fail('invalid_base64')
+
+        if not header_checked:
+            self.fail('invalid_image')
+
+        file.seek(0)
+        try:
+            Image.open(file).verify()
+        except Exception:
+            self.fail('invalid_image')
+
+        return self.ALLOWED_FORMATS[parser.image.format]
+
+    def check_header(self, image):
+        max_width, max_height = settings.RECIPE_IMAGE_MAX_DIMENSIONS
+
+        if image.format not in self.ALLOWED_FORMATS:
+            self.fail('invalid_image')
+
+        width, height = image.size
+        if width > max_width or height > max_height:
+            self.fail('too_big_dimensions',
+                      max_width=max_width, max_height=max_height)
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """ Ссылки на уменьшенные версии изображения рецепта. """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        renditions = {}
+
+        for name, paths in value.items():
+            if name == 'source':
+                continue
+
+            renditions[name] = {}
+            for extension, path in paths.items():
+                url = default_storage.url(path)
+                renditions[name][extension] = (
+                    request.build_absolute_uri(url) if request else url)
+
+        return renditions
+
+
+class CustomUserReadSerializer(TimedSerializerMixin,
+                               serializers.ModelSerializer):
     """ Сериализатор для чтения данных о пользователе из БД.  """
     is_subscribed = serializers.SerializerMethodField()
 
@@ -22,6 +230,11 @@ class CustomUserReadSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """ Фукция для проверки наличия подписок. """
+        is_subscribed = getattr(obj, 'is_subscribed', None)
+
+        if is_subscribed is not None:
+            return is_subscribed
+
         return bool(
             self.context.get('request')
             and self.context.get('request').user.is_authenticated
@@ -31,14 +244,14 @@ class CustomUserReadSerializer(serializers.ModelSerializer):
             .exists())
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """ Сериализатор тега. """
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """ Сериализатор ингридиентов. """
     class Meta:
         model = Ingredient
@@ -57,40 +270,57 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(read_only=True, many=True)
     ingredients = RecipeIngredientSerializer(
         read_only=True, many=True, source='recipe_ingredients')
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     author = CustomUserReadSerializer(read_only=True)
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time')
+            'is_in_shopping_cart', 'name', 'image', 'image_renditions',
+            'text', 'cooking_time')
+
+    def to_representation(self, instance):
+        is_subscribed = getattr(instance, 'author_is_subscribed', None)
+
+        if is_subscribed is not None:
+            instance.author.is_subscribed = is_subscribed
+
+        return super().to_representation(instance)
+
+    def get_user_flag(self, obj, annotation, model):
+        """ Флаг пользователя: аннотация из queryset или запрос в БД. """
+        value = getattr(obj, annotation, None)
+
+        if value is not None:
+            return value
+
+        request = self.context.get('request')
 
-    def get_is_favorited(self, obj):
         return bool(
-            self.context.get('request')
-            and self.context.get('request').user.is_authenticated
-            and Favorite.objects.filter(
+            request
+            and request.user.is_authenticated
+            and model.objects.filter(
                 recipe=obj,
-                customer=self.context.get('request').user).exists())
+                customer=request.user).exists())
+
+    def get_is_favorited(self, obj):
+        return self.get_user_flag(obj, 'is_favorited', Favorite)
 
     def get_is_in_shopping_cart(self, obj):
-        return bool(
-            self.context.get('request')
-            and self.context.get('request').user.is_authenticated
-            and ShoppingCart.objects.filter(
-                recipe=obj,
-                customer=self.context.get('request').user).exists())
+        return self.get_user_flag(obj, 'is_in_shopping_cart', ShoppingCart)
 
 
 class AddRecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all())
+    id = BulkPrimaryKeyRelatedField(
+        queryset=Ingredient.objects.all(),
+        collect_pks=collect_ingredient_pks)
 
     class Meta:
         model = RecipeIngredient
@@ -99,9 +329,9 @@ class AddRecipeIngredientSerializer(serializers.ModelSerializer):
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     ingredients = AddRecipeIngredientSerializer(many=True, write_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True)
-    image = Base64ImageField()
+    tags = BulkPrimaryKeyRelatedField(
+        queryset=Tag.objects.all(), many=True, collect_pks=collect_tag_pks)
+    image = StreamingBase64ImageField()
     author = serializers.HiddenField(
         default=serializers.CurrentUserDefault())
 
@@ -160,21 +390,65 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
         recipe = Recipe.objects.create(**validated_data)
         self.safe_ingredients(recipe, ingredients_data)
-        recipe.tags.set(tags_data)
+        RecipeTag.objects.bulk_create(
+            [RecipeTag(recipe=recipe, tag=tag) for tag in tags_data])
 
         return recipe
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients_data):
+        """ Применяет к рецепту только изменения в ингредиентах.
+
+        Возвращает изменение количества по каждому оставшемуся
+        ингредиенту. Списки покупок по удаленным строкам пересчитывает
+        сигнал post_delete.
+        """
+        existing = {item.ingredient_id: item
+                    for item in recipe.recipe_ingredients.all()}
+        amounts = {ingredient_data['id'].id: ingredient_data['amount']
+                   for ingredient_data in ingredients_data}
+
+        deltas = {ingredient_id: amounts.get(ingredient_id, 0)
+                  - (existing[ingredient_id].amount
+                     if ingredient_id in existing else 0)
+                  for ingredient_id in amounts}
+        removed = [item.pk for ingredient_id, item in existing.items()
+                   if ingredient_id not in amounts]
+        changed = []
+        created = []
+
+        for ingredient_id, amount in amounts.items():
+            item = existing.get(ingredient_id)
+
+            if item is None:
+                created.append(RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount))
+            elif item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        if created:
+            RecipeIngredient.objects.bulk_create(created)
+
+        return deltas
+
     @transaction.atomic
     def update(self, instance, validated_data):
 
-        ingredients_data = validated_data.pop('ingredients', [])
-        tags_data = validated_data.pop('tags', [])
+        ingredients_data = validated_data.pop('ingredients', None)
+        tags_data = validated_data.pop('tags', None)
 
-        instance.ingredients.clear()
-        instance.tags.clear()
         instance = super().update(instance, validated_data)
-        self.safe_ingredients(instance, ingredients_data)
-        instance.tags.set(tags_data)
+
+        if ingredients_data is not None:
+            update_recipe_in_shopping_lists(
+                instance, self.update_ingredients(instance, ingredients_data))
+        if tags_data is not None:
+            instance.tags.set(tags_data)
 
         return instance
 
@@ -182,26 +456,38 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         return RecipeReadSerializer(instance).data
 
 
-class RecipeFollowSerializer(serializers.ModelSerializer):
+class RecipeFollowSerializer(TimedSerializerMixin,
+                             serializers.ModelSerializer):
     ''' Сериализатор модели рецепта при выводе подписок. '''
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
 
 
-class BaseFavoriteShoppingCartSerializer(serializers.ModelSerializer):
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    ''' Сериализатор позиции списка покупок. '''
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit')
+    amount = serializers.ReadOnlyField(source='total_amount')
 
-    def validate(self, data):
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
 
-        request = self.context.get('request')
 
-        cart_instance = self.model.objects.filter(
-            recipe=data['recipe'], customer=request.user).first()
+class BaseFavoriteShoppingCartSerializer(serializers.ModelSerializer):
 
-        if cart_instance:
-            raise serializers.ValidationError(self.message)
-        return data
+    def create(self, validated_data):
+        instance = insert_or_ignore(self.model, **validated_data)
+
+        if instance is None:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [self.message]})
+        return instance
 
     def to_representation(self, instance):
         return RecipeFollowSerializer(instance.recipe).data
@@ -242,23 +528,35 @@ class FollowReadSerializer(CustomUserReadSerializer):
             )
         ]
 
-    def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit', DEFAULT_FOLLOW_RECIPE_LIMIT)
-
+    @staticmethod
+    def get_recipes_limit(request):
         try:
-            limit = int(limit)
+            return int(request.GET.get(
+                'recipes_limit', DEFAULT_FOLLOW_RECIPE_LIMIT))
         except ValueError:
-            pass
+            return DEFAULT_FOLLOW_RECIPE_LIMIT
+
+    def get_recipes(self, obj):
+        recipes_by_author = self.context.get('recipes_by_author')
+
+        if recipes_by_author is not None:
+            recipes = recipes_by_author.get(obj.pk, [])
+        else:
+            limit = self.get_recipes_limit(self.context.get('request'))
+            recipes = Recipe.objects.filter(author=obj)[:limit]
 
-        recipes = Recipe.objects.filter(author=obj)[:limit]
         serializer = RecipeFollowSerializer(recipes, many=True)
         return serializer.data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+        return obj.recipes_count
 
     def to_representation(self, instance):
+        request = self.context.get('request')
+
+        if request and instance.user_id == request.user.id:
+            instance.following.is_subscribed = True
+
         return super().to_representation(instance.following)
 
 
@@ -271,22 +569,21 @@ class FollowSerializer(serializers.ModelSerializer):
     def validate(self, data):
         request = self.context.get('request')
 
-        following = User.objects.filter(
-            pk=data.get('following').id).first()
-
-        if following == request.user:
+        if data.get('following') == request.user:
             raise serializers.ValidationError(
                 'Вы не можете подписаться на себя.'
             )
 
-        follow_instance = Follow.objects.filter(
-            user=request.user, following=following).first()
+        return data
 
-        if follow_instance:
-            raise serializers.ValidationError(
-                'Вы уже подписаны на этого пользователя.')
+    def create(self, validated_data):
+        instance = insert_or_ignore(Follow, **validated_data)
 
-        return data
+        if instance is None:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Вы уже подписаны на этого пользователя.']})
+        return instance
 
     def to_representation(self, instance):
         return FollowReadSerializer(instance, context=self.context).data
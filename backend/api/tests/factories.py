@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                            Tag)
+
+User = get_user_model()
+
+TEST_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAQMAAAAl21bK'
+    'AAAAA1BMVEUAAACnej3aAAAAAXRSTlMAQObYZgAAAApJREFUCNdjYAAAAAIAAeIh'
+    'vDMAAAAASUVORK5CYII=')
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@foodgram.ru',
+        password=None,
+        first_name=username,
+        last_name=username)
+
+
+def create_tags(count):
+    return [Tag.objects.create(name=f'Тег {index}', color=f'#{index:06X}',
+                               slug=f'tag-{index}')
+            for index in range(count)]
+
+
+def create_ingredients(count):
+    return [Ingredient.objects.create(name=f'ингредиент {index}',
+                                      measurement_unit='г')
+            for index in range(count)]
+
+
+def create_recipe(author, amounts, tags=(), name='Рецепт'):
+    """ Рецепт с ингредиентами {ингредиент: количество} и тегами. """
+    recipe = Recipe.objects.create(
+        author=author, name=name, text='Описание', cooking_time=10,
+        image='media/recipe.png')
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in amounts.items())
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe=recipe, tag=tag) for tag in tags)
+
+    return recipe
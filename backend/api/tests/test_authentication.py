@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.authentication import token_cache
+from .factories import create_user
+
+User = get_user_model()
+
+PASSWORD = 'old-Passw0rd'
+
+
+class CachedTokenUserSaveTest(APITestCase):
+    """ Сохранение пользователя из кэша токенов не затирает счетчики. """
+
+    def setUp(self):
+        self.user = create_user('reader')
+        self.user.set_password(PASSWORD)
+        self.user.save()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.addCleanup(token_cache.invalidate, token.key)
+
+        response = self.client.get(reverse('user-me'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        User.objects.filter(pk=self.user.pk).update(
+            followers_count=F('followers_count') + 1,
+            recipes_count=F('recipes_count') + 2)
+
+    def assert_counters(self):
+        self.user.refresh_from_db()
+        self.assertEqual(
+            (self.user.followers_count, self.user.recipes_count), (1, 2))
+
+    def test_set_password_keeps_counters(self):
+        response = self.client.post(
+            reverse('user-set-password'),
+            {'current_password': PASSWORD, 'new_password': 'new-Passw0rd'})
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assert_counters()
+        self.assertTrue(self.user.check_password('new-Passw0rd'))
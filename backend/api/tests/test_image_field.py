@@ -0,0 +1,54 @@
+import base64
+import io
+import os
+import tracemalloc
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from api.serializers import StreamingBase64ImageField
+
+# Шум почти не сжимается: PNG 1200x1200 весит около 4 МБ.
+IMAGE_SIDE = 1200
+
+
+def make_png(side):
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', compress_level=0)
+    return buffer.getvalue()
+
+
+@override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+class StreamingBase64ImageFieldTest(SimpleTestCase):
+    """ Декодирование base64 без копий всей строки в памяти. """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.image = make_png(IMAGE_SIDE)
+        cls.data = ('data:image/png;base64,'
+                    + base64.encodebytes(cls.image).decode())
+
+    def decode(self, data):
+        file = StreamingBase64ImageField().to_internal_value(data)
+        try:
+            return file.read()
+        finally:
+            file.close()
+
+    def test_decodes_data_url_with_line_breaks(self):
+        self.assertEqual(self.decode(self.data), self.image)
+
+    def test_peak_memory_below_payload_size(self):
+        field = StreamingBase64ImageField()
+
+        tracemalloc.start()
+        try:
+            field.to_internal_value(self.data).close()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # Одна копия строки целиком уже заняла бы len(data) байт.
+        self.assertLess(peak, len(self.data) / 4)
@@ -0,0 +1,53 @@
+import tablib
+from django.test import TestCase
+
+from recipes.admin import IngredientResource
+from recipes.models import Ingredient
+
+INGREDIENTS = 3001
+# Файл выгружен из другой базы: id в нем не совпадают с локальными.
+FOREIGN_ID_OFFSET = 10000
+
+
+class IngredientImportTest(TestCase):
+    """ Повторный импорт справочника сопоставляет строки по ключу. """
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {index}', measurement_unit='г')
+            for index in range(INGREDIENTS))
+
+    def exported(self, id_offset=0):
+        dataset = IngredientResource().export()
+        rows = [(pk + id_offset, name, measurement_unit)
+                for pk, name, measurement_unit in dataset]
+
+        return tablib.Dataset(*rows, headers=dataset.headers)
+
+    def import_data(self, dataset):
+        result = IngredientResource().import_data(dataset, dry_run=False)
+        self.assertFalse(result.has_errors())
+        return result.totals
+
+    def test_unchanged_rows_skipped(self):
+        for id_offset in (0, FOREIGN_ID_OFFSET):
+            with self.subTest(id_offset=id_offset):
+                totals = self.import_data(self.exported(id_offset))
+
+                self.assertEqual(
+                    (totals['skip'], totals['update'], totals['new']),
+                    (INGREDIENTS, 0, 0))
+
+    def test_new_row_gets_local_id(self):
+        dataset = self.exported(FOREIGN_ID_OFFSET)
+        dataset.append((FOREIGN_ID_OFFSET * 2, 'новый ингредиент', 'шт.'))
+
+        totals = self.import_data(dataset)
+
+        self.assertEqual(
+            (totals['skip'], totals['update'], totals['new']),
+            (INGREDIENTS, 0, 1))
+        self.assertLess(
+            Ingredient.objects.get(name='новый ингредиент').pk,
+            FOREIGN_ID_OFFSET)
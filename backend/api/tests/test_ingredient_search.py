@@ -0,0 +1,62 @@
+import time
+from itertools import product
+
+from django.test import TestCase
+
+from recipes.models import Ingredient
+from recipes.prefix_index import IngredientPrefixIndex
+
+SYLLABLES = ('ба', 'ви', 'го', 'де', 'жу', 'зо', 'ки', 'ле', 'мо', 'ну')
+QUERIES = ('б', 'ба', 'виго', 'де', 'жузо', 'кил', 'мону', 'ну', 'о', 'я')
+# Повторы каждого запроса при замере, чтобы сгладить шум таймера.
+BENCHMARK_ROUNDS = 20
+
+
+def benchmark(search):
+    """ Суммарное время поиска по всем QUERIES за BENCHMARK_ROUNDS. """
+    started = time.perf_counter()
+
+    for _ in range(BENCHMARK_ROUNDS):
+        for query in QUERIES:
+            list(search(query))
+
+    return time.perf_counter() - started
+
+
+class IngredientPrefixIndexTest(TestCase):
+    """ Индекс в памяти против ORM-поиска по началу названия. """
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=''.join(parts), measurement_unit='г')
+            for parts in product(SYLLABLES, repeat=4))
+
+    def setUp(self):
+        self.index = IngredientPrefixIndex()
+        self.index.ensure_built()
+
+    @staticmethod
+    def orm_search(query):
+        return Ingredient.objects.filter(name__istartswith=query)
+
+    def test_prefix_matches_equal_orm(self):
+        for query in QUERIES:
+            with self.subTest(query=query):
+                expected = {ingredient.pk
+                            for ingredient in self.orm_search(query)}
+                found = self.index.search(query)
+
+                self.assertEqual(
+                    {ingredient.pk for ingredient in found[:len(expected)]},
+                    expected)
+                self.assertTrue(all(
+                    query in ingredient.name
+                    for ingredient in found[len(expected):]))
+
+    def test_index_faster_than_orm(self):
+        orm_time = benchmark(self.orm_search)
+        index_time = benchmark(self.index.search)
+
+        # На 10 000 ингредиентов в SQLite индекс быстрее примерно вчетверо.
+        self.assertLess(index_time, orm_time / 2)
@@ -0,0 +1,33 @@
+import json
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from foodgram.instrumentation import QueryBudgetExceeded, view_stats
+
+
+class InstrumentationTest(APITestCase):
+    """ Бюджет SQL-запросов и сводка метрик по представлениям. """
+
+    def setUp(self):
+        view_stats.reset()
+        self.addCleanup(view_stats.reset)
+
+    @override_settings(API_QUERY_BUDGET_MODE='raise',
+                       API_QUERY_BUDGETS={'RecipeViewSet.list': 0})
+    def test_budget_exceeded_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('recipes-list'))
+
+    @override_settings(API_VIEW_STATS_INTERVAL=2)
+    def test_view_stats_logged_every_interval(self):
+        self.client.get(reverse('recipes-list'))
+
+        with self.assertLogs('foodgram.instrumentation', 'INFO') as logs:
+            self.client.get(reverse('recipes-list'))
+
+        record, = logs.records
+        _, stats = record.getMessage().split(': ', 1)
+        self.assertEqual(
+            json.loads(stats)['RecipeViewSet.list']['requests'], 2)
@@ -0,0 +1,86 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+from .factories import (create_ingredients, create_recipe, create_tags,
+                        create_user)
+
+# Количество, страница рецептов, теги и ингредиенты страницы.
+RECIPE_LIST_QUERIES = 4
+# Рецепт, его теги и ингредиенты.
+RECIPE_DETAIL_QUERIES = 3
+
+
+@override_settings(API_QUERY_BUDGET_MODE='raise')
+class RecipeReadQueriesTest(APITestCase):
+    """ Число запросов при чтении рецептов не зависит от их количества. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        authors = [create_user(f'author{index}') for index in range(10)]
+        tags = create_tags(3)
+        ingredients = create_ingredients(5)
+
+        cls.recipes = [
+            create_recipe(
+                authors[index % len(authors)],
+                {ingredients[index % 5]: 10,
+                 ingredients[(index + 1) % 5]: 5},
+                tags[:index % 3 + 1],
+                name=f'Рецепт {index}')
+            for index in range(100)]
+
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, following=author)
+            for author in authors[::2])
+        Favorite.objects.bulk_create(
+            Favorite(customer=cls.reader, recipe=recipe)
+            for recipe in cls.recipes[::3])
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(customer=cls.reader, recipe=recipe)
+            for recipe in cls.recipes[::4])
+
+    def assert_list_queries(self):
+        for page_size in (6, 50, 100):
+            with self.subTest(page_size=page_size):
+                with self.assertNumQueries(RECIPE_LIST_QUERIES):
+                    response = self.client.get(
+                        reverse('recipes-list'), {'limit': page_size})
+
+                self.assertEqual(len(response.data['results']), page_size)
+
+    def test_list_queries_for_anonymous(self):
+        self.assert_list_queries()
+
+    def test_list_queries_for_user(self):
+        self.client.force_authenticate(self.reader)
+        self.assert_list_queries()
+
+    def test_list_flags(self):
+        self.client.force_authenticate(self.reader)
+        response = self.client.get(reverse('recipes-list'), {'limit': 100})
+        recipes = {recipe.pk: recipe for recipe in self.recipes}
+
+        for item in response.data['results']:
+            recipe = recipes[item['id']]
+            index = self.recipes.index(recipe)
+            self.assertEqual(item['is_favorited'], index % 3 == 0)
+            self.assertEqual(item['is_in_shopping_cart'], index % 4 == 0)
+            self.assertEqual(
+                item['author']['is_subscribed'],
+                recipe.author.username in {
+                    f'author{index}' for index in range(0, 10, 2)})
+            self.assertEqual(len(item['tags']), index % 3 + 1)
+            self.assertEqual(len(item['ingredients']), 2)
+
+    def test_detail_queries(self):
+        self.client.force_authenticate(self.reader)
+
+        with self.assertNumQueries(RECIPE_DETAIL_QUERIES):
+            response = self.client.get(
+                reverse('recipes-detail', args=(self.recipes[0].pk,)))
+
+        self.assertEqual(response.data['id'], self.recipes[0].pk)
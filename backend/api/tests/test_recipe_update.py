@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe, RecipeIngredient
+from .factories import (TEST_IMAGE, create_ingredients, create_recipe,
+                        create_tags, create_user)
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeUpdateTest(APITestCase):
+    """ Изменение рецепта пишет в базу только разницу ингредиентов. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = create_tags(2)
+        cls.ingredients = create_ingredients(5)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+        first, second, third = self.ingredients[:3]
+        self.recipe = create_recipe(
+            self.author, {first: 10, second: 20, third: 30}, self.tags)
+
+    def patch(self, amounts):
+        """ PATCH рецепта, возвращает ответ и число пишущих запросов. """
+        data = {
+            'name': 'Новое название',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': TEST_IMAGE,
+            'tags': [tag.pk for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': amount}
+                for ingredient, amount in amounts.items()],
+        }
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                reverse('recipes-detail', args=(self.recipe.pk,)),
+                data, format='json')
+
+        writes = [query['sql'] for query in context.captured_queries
+                  if query['sql'].lstrip().upper().startswith(
+                      WRITE_STATEMENTS)]
+
+        return response, writes
+
+    def get_amounts(self):
+        return dict(RecipeIngredient.objects.filter(
+            recipe=self.recipe).values_list('ingredient', 'amount'))
+
+    def assert_update(self, amounts, expected_writes):
+        """ expected_writes включает обновление самой строки рецепта. """
+        response, writes = self.patch(amounts)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(writes), expected_writes, writes)
+        self.assertEqual(
+            self.get_amounts(),
+            {ingredient.pk: amount for ingredient, amount in amounts.items()})
+        self.assertEqual(
+            {(item['id'], item['amount'])
+             for item in response.data['ingredients']},
+            {(ingredient.pk, amount)
+             for ingredient, amount in amounts.items()})
+
+    def test_unchanged_ingredients(self):
+        first, second, third = self.ingredients[:3]
+        self.assert_update({first: 10, second: 20, third: 30}, 1)
+
+    def test_changed_amount(self):
+        first, second, third = self.ingredients[:3]
+        self.assert_update({first: 15, second: 20, third: 30}, 2)
+
+    def test_added_ingredient(self):
+        first, second, third, fourth = self.ingredients[:4]
+        self.assert_update({first: 10, second: 20, third: 30, fourth: 40}, 2)
+
+    def test_removed_ingredient(self):
+        first, second = self.ingredients[:2]
+        self.assert_update({first: 10, second: 20}, 2)
+
+    def test_changed_added_and_removed(self):
+        first, second, _, fourth = self.ingredients[:4]
+        self.assert_update({first: 15, second: 20, fourth: 40}, 4)
+
+    def test_counters_not_written(self):
+        """ Счетчики ведутся через F() и не перезаписываются update. """
+        first, second, third = self.ingredients[:3]
+        response, writes = self.patch({first: 10, second: 20, third: 30})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for counter in Recipe.counter_fields:
+            with self.subTest(counter=counter):
+                self.assertFalse(
+                    [sql for sql in writes if counter in sql], writes)
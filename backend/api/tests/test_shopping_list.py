@@ -0,0 +1,178 @@
+import hashlib
+import tracemalloc
+from collections import Counter
+
+from django.db.models import Sum
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.renderers import ShoppingListRenderer
+from api.utils import get_shopping_list
+from recipes.models import Ingredient, RecipeIngredient, ShoppingCart
+from recipes.shopping_list import refresh_shopping_lists
+from .factories import create_ingredients, create_recipe, create_user
+
+LARGE_CART_RECIPES = 3000
+INGREDIENTS_PER_RECIPE = 3
+
+
+def render_body(totals):
+    """ Ожидаемый txt по строкам (название, единица, количество). """
+    lines = (
+        ShoppingListRenderer.get_line({
+            'ingredient__name': name,
+            'ingredient__measurement_unit': measurement_unit,
+            'total_ingredients': total,
+        })
+        for name, measurement_unit, total in totals)
+
+    return ''.join(
+        [f'{ShoppingListRenderer.title}\n\n']
+        + [f'{line}\n' for line in lines])
+
+
+def measure_peak(func):
+    """ Результат func и пик памяти, выделенной во время вызова. """
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, peak
+
+
+class ShoppingListDownloadTest(APITestCase):
+    """ Выгрузка списка покупок суммирует ингредиенты только из корзины. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = create_user('customer')
+        cls.other_customer = create_user('other')
+        author = create_user('author')
+        cls.ingredients = create_ingredients(20)
+        cls.recipes = [
+            create_recipe(
+                author,
+                {cls.ingredients[(index * 3 + offset) % 20]: index + offset
+                 for offset in range(1, 4)},
+                name=f'Рецепт {index}')
+            for index in range(30)]
+
+    def setUp(self):
+        self.client.force_authenticate(self.customer)
+
+    def add_to_cart(self, client, recipes):
+        for recipe in recipes:
+            response = client.post(
+                reverse('recipes-shopping-cart', args=(recipe.pk,)))
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def download(self):
+        response = self.client.get(
+            reverse('recipes-download-shopping-cart'), {'format': 'txt'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def expected_body(self, recipes):
+        totals = Counter()
+
+        for recipe in recipes:
+            for item in recipe.recipe_ingredients.select_related(
+                    'ingredient'):
+                totals[item.ingredient] += item.amount
+
+        return render_body(
+            (ingredient.name, ingredient.measurement_unit, total)
+            for ingredient, total in sorted(
+                totals.items(), key=lambda item: item[0].name))
+
+    def test_body_matches_cart_totals(self):
+        cart = self.recipes[:15]
+        self.add_to_cart(self.client, cart)
+
+        other_client = self.client_class()
+        other_client.force_authenticate(self.other_customer)
+        self.add_to_cart(other_client, self.recipes[10:])
+
+        self.assertEqual(self.download(), self.expected_body(cart))
+
+    def test_body_follows_cart_changes(self):
+        cart = self.recipes[:5]
+        self.add_to_cart(self.client, cart)
+        response = self.client.delete(
+            reverse('recipes-shopping-cart', args=(cart[0].pk,)))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(self.download(), self.expected_body(cart[1:]))
+
+
+class LargeShoppingListDownloadTest(APITestCase):
+    """ Большая корзина отдается потоком, без списка целиком в памяти. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = create_user('customer')
+        author = create_user('author')
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {index:05}', measurement_unit='г')
+            for index in range(LARGE_CART_RECIPES * INGREDIENTS_PER_RECIPE))
+        ingredients = list(Ingredient.objects.order_by('name'))
+
+        recipes = [
+            create_recipe(
+                author,
+                {ingredient: index % 100 + 1
+                 for ingredient in ingredients[
+                     index * INGREDIENTS_PER_RECIPE:
+                     (index + 1) * INGREDIENTS_PER_RECIPE]},
+                name=f'Рецепт {index}')
+            for index in range(LARGE_CART_RECIPES)]
+
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(customer=cls.customer, recipe=recipe)
+            for recipe in recipes)
+        refresh_shopping_lists([cls.customer.pk])
+
+    def setUp(self):
+        self.client.force_authenticate(self.customer)
+
+    def expected_body(self):
+        return render_body(
+            RecipeIngredient.objects
+            .filter(recipe__shoppingcart__customer=self.customer)
+            .values_list('ingredient__name', 'ingredient__measurement_unit')
+            .annotate(total=Sum('amount'))
+            .order_by('ingredient__name')).encode()
+
+    def download_digest(self):
+        """ Читает ответ по частям, не собирая тело целиком. """
+        response = self.client.get(
+            reverse('recipes-download-shopping-cart'), {'format': 'txt'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        digest = hashlib.sha256()
+        size = 0
+
+        for chunk in response.streaming_content:
+            digest.update(chunk)
+            size += len(chunk)
+
+        return digest.hexdigest(), size
+
+    def test_streamed_peak_memory(self):
+        expected = self.expected_body()
+        (digest, size), streamed_peak = measure_peak(self.download_digest)
+        _, materialized_peak = measure_peak(
+            lambda: list(get_shopping_list(self.customer)))
+
+        self.assertEqual(
+            (digest, size),
+            (hashlib.sha256(expected).hexdigest(), len(expected)))
+        # Поток держит в памяти одну порцию строк iterator(), а не список.
+        self.assertLess(streamed_peak, materialized_peak / 2)
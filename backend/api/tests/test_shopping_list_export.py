@@ -0,0 +1,40 @@
+import time
+
+from django.test import SimpleTestCase
+
+from api.renderers import (JsonShoppingListRenderer,
+                           ShoppingListExportTimeout, render_with_time_limit)
+
+TIME_LIMIT = 0.2
+# Дольше любого теста: рендер завершится только по таймеру.
+RENDER_SECONDS = 60
+
+
+class SlowShoppingListRenderer(JsonShoppingListRenderer):
+
+    def render(self, items):
+        time.sleep(RENDER_SECONDS)
+
+
+class RenderTimeLimitTest(SimpleTestCase):
+    """ Рендер в пуле прерывается сам, не занимая процесс до конца. """
+
+    def test_slow_render_interrupted(self):
+        started = time.monotonic()
+
+        with self.assertRaises(ShoppingListExportTimeout):
+            render_with_time_limit(SlowShoppingListRenderer(), [], TIME_LIMIT)
+
+        self.assertLess(time.monotonic() - started, RENDER_SECONDS / 10)
+
+    def test_fast_render_keeps_result(self):
+        items = [{'ingredient__name': 'соль',
+                  'ingredient__measurement_unit': 'г',
+                  'total_ingredients': 5}]
+
+        content = render_with_time_limit(
+            JsonShoppingListRenderer(), items, TIME_LIMIT)
+        time.sleep(TIME_LIMIT * 2)
+
+        self.assertEqual(
+            content, JsonShoppingListRenderer().render(items))
@@ -0,0 +1,88 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.constants import DEFAULT_FOLLOW_RECIPE_LIMIT
+from users.models import Follow
+from .factories import create_ingredients, create_recipe, create_user
+
+# Количество подписок, страница подписок с авторами и рецепты авторов.
+SUBSCRIPTIONS_QUERIES = 3
+RECIPES_PER_AUTHOR = 6
+
+
+@override_settings(API_QUERY_BUDGET_MODE='raise')
+class SubscriptionsTest(APITestCase):
+    """ Лента подписок: число запросов и рецепты авторов. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        ingredient, = create_ingredients(1)
+        cls.authors = [create_user(f'author{index}') for index in range(100)]
+        cls.recipes = {
+            author.pk: [
+                create_recipe(author, {ingredient: 1}, name=f'Рецепт {index}')
+                for index in range(RECIPES_PER_AUTHOR)]
+            for author in cls.authors[:10]}
+
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, following=author)
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def get_subscriptions(self, **params):
+        return self.client.get(reverse('user-subscriptions'), params)
+
+    def get_recipe_ids(self, response):
+        return {author['id']: [recipe['id'] for recipe in author['recipes']]
+                for author in response.data['results']}
+
+    def latest_recipe_ids(self, author_id, limit):
+        return [recipe.pk
+                for recipe in self.recipes[author_id][::-1][:limit]]
+
+    def test_queries_do_not_depend_on_page_size(self):
+        for page_size in (6, 50, 100):
+            with self.subTest(page_size=page_size):
+                with self.assertNumQueries(SUBSCRIPTIONS_QUERIES):
+                    response = self.get_subscriptions(limit=page_size)
+
+                self.assertEqual(len(response.data['results']), page_size)
+
+    def test_latest_recipes_first(self):
+        response = self.get_subscriptions(limit=100, recipes_limit=3)
+
+        for author_id, recipe_ids in self.get_recipe_ids(response).items():
+            with self.subTest(author_id=author_id):
+                if author_id in self.recipes:
+                    self.assertEqual(
+                        recipe_ids, self.latest_recipe_ids(author_id, 3))
+                else:
+                    self.assertEqual(recipe_ids, [])
+
+    def test_authors_ordered_by_subscription(self):
+        response = self.get_subscriptions(limit=100)
+
+        self.assertEqual(
+            [author['id'] for author in response.data['results']],
+            [author.pk for author in reversed(self.authors)])
+
+    def test_recipes_limit_edge_cases(self):
+        cases = (
+            ('0', 0),
+            ('1', 1),
+            (str(RECIPES_PER_AUTHOR + 10), RECIPES_PER_AUTHOR),
+            ('abc', DEFAULT_FOLLOW_RECIPE_LIMIT),
+        )
+        author_id = self.authors[0].pk
+
+        for recipes_limit, expected in cases:
+            with self.subTest(recipes_limit=recipes_limit):
+                response = self.get_subscriptions(
+                    limit=100, recipes_limit=recipes_limit)
+
+                self.assertEqual(
+                    self.get_recipe_ids(response)[author_id],
+                    self.latest_recipe_ids(author_id, expected))
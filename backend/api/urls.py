@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import UserViewSet
+from .async_views import async_reference_view
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet
 
 router = DefaultRouter()
@@ -14,3 +16,15 @@ urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.SERVER_MODE == 'asgi':
+    urlpatterns = [
+        path('tags/',
+             async_reference_view(TagViewSet, {'get': 'list'})),
+        path('tags/<int:pk>/',
+             async_reference_view(TagViewSet, {'get': 'retrieve'})),
+        path('ingredients/',
+             async_reference_view(IngredientViewSet, {'get': 'list'})),
+        path('ingredients/<int:pk>/',
+             async_reference_view(IngredientViewSet, {'get': 'retrieve'})),
+    ] + urlpatterns
@@ -1,26 +1,109 @@
+import hashlib
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.module_loading import import_string
 
-from recipes.models import RecipeIngredient
+from recipes.models import ShoppingListItem
+from .renderers import ShoppingListExportTimeout, render_with_time_limit
 
 User = get_user_model()
 
 
-def download_recipe(self, request):
-    """ Функция для скачивания списка покупок. """
+@lru_cache(maxsize=None)
+def get_shopping_list_executor():
+    """ Пул процессов для больших списков, создается в воркере.
+
+    Рендер PDF упирается в процессор и GIL, поэтому пул потоков не
+    разгружал воркер. Процессы запускаются через spawn, чтобы не
+    форкать многопоточный воркер.
+    """
+
+    return ProcessPoolExecutor(
+        max_workers=settings.SHOPPING_LIST_EXPORT_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'))
 
-    ingredients_data = RecipeIngredient.objects.values(
+
+def get_shopping_list(user):
+    """ Суммарное количество ингредиентов в корзине пользователя. """
+
+    return ShoppingListItem.objects.filter(
+        user=user, total_amount__gt=0
+    ).values(
         'ingredient__name', 'ingredient__measurement_unit'
-    ).annotate(total_ingredients=Sum('amount')).order_by('ingredient__name')
+    ).annotate(
+        total_ingredients=F('total_amount')
+    ).order_by('ingredient__name')
+
+
+@lru_cache(maxsize=None)
+def get_shopping_list_renderers():
+    """ Рендеры списка покупок из настроек, по формату. """
+
+    renderers = (import_string(path)
+                 for path in settings.SHOPPING_LIST_RENDERERS)
+
+    return {renderer.format: renderer for renderer in renderers}
+
+
+def get_shopping_list_renderer(export_format):
+    renderer_class = get_shopping_list_renderers().get(export_format)
+
+    if renderer_class is None:
+        return None
+
+    return renderer_class()
+
+
+def get_shopping_list_cache_key(renderer, items):
+    """ Ключ кэша по хэшу содержимого корзины. """
+
+    digest = hashlib.sha256(
+        json.dumps(items, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+    return f'shopping_list:{renderer.format}:{digest}'
+
+
+def download_recipe(user, renderer):
+    """ Содержимое файла списка покупок.
+
+    Построчные форматы отдаются генератором. Остальные рендерятся целиком,
+    большие списки - в пуле процессов, и кэшируются по содержимому корзины.
+    Если рендер не уложился в SHOPPING_LIST_EXPORT_TIMEOUT, выбрасывается
+    ShoppingListExportTimeout, а процесс пула прерывает рендер сам.
+    """
+
+    shopping_list = get_shopping_list(user)
+
+    if renderer.streaming:
+        return renderer.render(shopping_list.iterator())
 
-    txt_content = 'Список ингредиентов для покупки:\n\n'
+    items = list(shopping_list)
+    cache_key = get_shopping_list_cache_key(renderer, items)
+    content = cache.get(cache_key)
 
-    for item in ingredients_data:
-        ingredient_name = item.get('ingredient__name')
-        measurement_unit = item.get('ingredient__measurement_unit')
-        tolal_amount = item.get('total_ingredients')
+    if content is None:
+        if len(items) >= settings.SHOPPING_LIST_EXPORT_THRESHOLD:
+            future = get_shopping_list_executor().submit(
+                render_with_time_limit, renderer, items,
+                settings.SHOPPING_LIST_EXPORT_TIMEOUT)
+            try:
+                content = future.result(
+                    timeout=settings.SHOPPING_LIST_EXPORT_TIMEOUT)
+            except FutureTimeoutError:
+                future.cancel()
+                raise ShoppingListExportTimeout
+        else:
+            content = renderer.render(items)
 
-        txt_content += (f'{ingredient_name.capitalize()} -- {tolal_amount}'
-                        f' {measurement_unit}.\n')
+        cache.set(cache_key, content, settings.SHOPPING_LIST_CACHE_TIMEOUT)
 
-    return txt_content
+    return content
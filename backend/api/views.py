@@ -1,7 +1,12 @@
+from collections import defaultdict
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils.text import slugify
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet as DjoserUserViewset
@@ -10,18 +15,27 @@ from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag)
+from recipes.shopping_list import add_recipe_to_shopping_list
 from users.models import Follow
-from .utils import download_recipe
+from .utils import (ShoppingListExportTimeout, download_recipe,
+                    get_shopping_list_renderer)
 from .filters import IngredientFilter, RecipeFilter
+from .mixins import CachedReferenceMixin, ReplicaReadMixin
 from .pagination import FoodgramPagination
 from .permissions import IsAdminUserOrReadOnly, IsOwnerOrIsAdminOrReadOnly
+from .renderers import ShoppingListContentNegotiation
 from .serializers import (FavoriteSerializer, IngredientSerializer,
                           RecipeReadSerializer, RecipeWriteSerializer,
-                          ShoppingCartSerializer, TagSerializer,
+                          ShoppingCartSerializer, ShoppingListItemSerializer,
+                          TagSerializer,
                           CustomUserReadSerializer, FollowSerializer,
                           FollowReadSerializer)
-from .constants import (SHOPPING_CART_FAVORITE_SUCCESS_MESSAGE,
+from .constants import (DEFAULT_SHOPPING_LIST_FORMAT,
+                        SHOPPING_CART_FAVORITE_SUCCESS_MESSAGE,
+                        SHOPPING_LIST_FORMAT_BAD_REQUEST_MESSAGE,
+                        SHOPPING_LIST_EXPORT_TIMEOUT_MESSAGE,
                         SHOPPING_CART_BAD_REQUEST_MESSAGE,
                         FAVORITE_BAD_REQUEST_MESSAGE,
                         SUBSCRIBE_BAD_REQUEST_MESSAGE,
@@ -30,13 +44,14 @@ from .constants import (SHOPPING_CART_FAVORITE_SUCCESS_MESSAGE,
 User = get_user_model()
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedReferenceMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminUserOrReadOnly,)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, CachedReferenceMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (IngredientFilter, )
@@ -44,35 +59,70 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('^name',)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     pagination_class = FoodgramPagination
+    cursor_ordering = ('-pub_date', '-id')
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsOwnerOrIsAdminOrReadOnly,)
 
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.for_read(self.request.user)
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        serializer.save()
+        User.objects.filter(pk=self.request.user.pk).update(
+            recipes_count=F('recipes_count') + 1)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        author_id = instance.author_id
+        instance.delete()
+        User.objects.filter(pk=author_id).update(
+            recipes_count=Greatest(F('recipes_count') - 1, 0))
+
     @staticmethod
-    def add_to_list(serializer_class, data, request):
+    def add_to_list(serializer_class, data, request, counter_field,
+                    on_create=None):
         serializer = serializer_class(data=data, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+
+        with transaction.atomic():
+            instance = serializer.save()
+            Recipe.objects.filter(pk=instance.recipe_id).update(
+                **{counter_field: F(counter_field) + 1})
+
+            if on_create:
+                on_create(request.user, instance.recipe)
+
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @staticmethod
     def delete_from_list(item_model_class, instance_model_class, request,
                          pk=None,
                          success_message='',
-                         bad_request_message=''):
+                         bad_request_message='',
+                         counter_field=None):
 
         item = get_object_or_404(item_model_class, pk=pk)
 
-        delete_cnt, _ = instance_model_class.objects.filter(
-            customer=request.user, recipe=item).delete()
+        with transaction.atomic():
+            delete_cnt, _ = instance_model_class.objects.filter(
+                customer=request.user, recipe=item).delete()
+
+            if delete_cnt:
+                item_model_class.objects.filter(pk=item.pk).update(
+                    **{counter_field: Greatest(
+                        F(counter_field) - delete_cnt, 0)})
 
         if delete_cnt:
             return Response(success_message, status=status.HTTP_204_NO_CONTENT)
@@ -96,7 +146,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.add_to_list(
             ShoppingCartSerializer,
             data,
-            request
+            request,
+            'shopping_carts_count',
+            add_recipe_to_shopping_list
         )
 
     @shopping_cart.mapping.delete
@@ -107,7 +159,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request,
             pk,
             SHOPPING_CART_FAVORITE_SUCCESS_MESSAGE,
-            SHOPPING_CART_BAD_REQUEST_MESSAGE
+            SHOPPING_CART_BAD_REQUEST_MESSAGE,
+            'shopping_carts_count'
         )
 
     @action(detail=True,
@@ -126,7 +179,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return self.add_to_list(
             FavoriteSerializer,
             data,
-            request
+            request,
+            'favorites_count'
         )
 
     @favorite.mapping.delete
@@ -137,33 +191,63 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request,
             pk,
             SHOPPING_CART_FAVORITE_SUCCESS_MESSAGE,
-            FAVORITE_BAD_REQUEST_MESSAGE
+            FAVORITE_BAD_REQUEST_MESSAGE,
+            'favorites_count'
         )
 
     @action(detail=False,
             methods=['get'],
             permission_classes=[permissions.IsAuthenticated])
+    def shopping_list(self, request):
+        """ Итоговый список покупок из материализованной таблицы. """
+
+        items = ShoppingListItem.objects.filter(
+            user=request.user
+        ).select_related('ingredient').order_by('ingredient__name')
+
+        return Response(ShoppingListItemSerializer(items, many=True).data)
+
+    @action(detail=False,
+            methods=['get'],
+            permission_classes=[permissions.IsAuthenticated],
+            content_negotiation_class=ShoppingListContentNegotiation)
     def download_shopping_cart(self, request):
 
-        txt_content = download_recipe(self, request)
+        renderer = get_shopping_list_renderer(
+            request.query_params.get('format', DEFAULT_SHOPPING_LIST_FORMAT))
 
-        if txt_content is None:
+        if renderer is None:
+            return Response(SHOPPING_LIST_FORMAT_BAD_REQUEST_MESSAGE,
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if not ShoppingCart.objects.filter(customer=request.user).exists():
             return Response('Корзина пуста.', status=status.HTTP_200_OK)
 
         date = datetime.now().strftime('%Y%m%d_%H%M%S')
 
-        txt_filename = (f'shopping_cart_'
-                        f'{slugify(request.user.username)}_{date}.txt')
-
-        response = HttpResponse(
-            txt_content, content_type='text/plain')
+        filename = (f'shopping_cart_'
+                    f'{slugify(request.user.username)}_{date}'
+                    f'.{renderer.format}')
+
+        try:
+            content = download_recipe(request.user, renderer)
+        except ShoppingListExportTimeout:
+            return Response(
+                SHOPPING_LIST_EXPORT_TIMEOUT_MESSAGE,
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(
+                    settings.SHOPPING_LIST_EXPORT_RETRY_AFTER)})
+
+        response_class = (StreamingHttpResponse if renderer.streaming
+                          else HttpResponse)
+        response = response_class(content, content_type=renderer.media_type)
         response['Content-Disposition'] = (
-            f'attachment; filename="{txt_filename}"')
+            f'attachment; filename="{filename}"')
 
         return response
 
 
-class UserViewSet(DjoserUserViewset):
+class UserViewSet(ReplicaReadMixin, DjoserUserViewset):
     """ Вью пользователя и управления подписками. """
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     pagination_class = FoodgramPagination
@@ -184,12 +268,22 @@ class UserViewSet(DjoserUserViewset):
             permission_classes=(permissions.IsAuthenticated,))
     def subscriptions(self, request):
         """ Получение подписок пользователя. """
-        subscriptions = Follow.objects.filter(user=request.user)
+        subscriptions = Follow.objects.filter(
+            user=request.user).select_related('following').order_by('-id')
         page = self.paginate_queryset(subscriptions)
-        serializer = FollowReadSerializer(page,
-                                          many=True,
-                                          context={'request': request}
-                                          )
+
+        recipes_by_author = defaultdict(list)
+        for recipe in Recipe.objects.latest_by_authors(
+                [follow.following_id for follow in page],
+                FollowReadSerializer.get_recipes_limit(request)):
+            recipes_by_author[recipe.author_id].append(recipe)
+
+        serializer = FollowReadSerializer(
+            page,
+            many=True,
+            context={'request': request,
+                     'recipes_by_author': recipes_by_author}
+        )
         return self.get_paginated_response(serializer.data)
 
     @action(
@@ -211,7 +305,12 @@ class UserViewSet(DjoserUserViewset):
 
         serializer = FollowSerializer(data=data, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+
+        with transaction.atomic():
+            serializer.save()
+            User.objects.filter(pk=following.pk).update(
+                followers_count=F('followers_count') + 1)
+
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
@@ -220,8 +319,14 @@ class UserViewSet(DjoserUserViewset):
 
         item = get_object_or_404(User, pk=pk)
 
-        delete_cnt, _ = Follow.objects.filter(
-            user=request.user, following=item).delete()
+        with transaction.atomic():
+            delete_cnt, _ = Follow.objects.filter(
+                user=request.user, following=item).delete()
+
+            if delete_cnt:
+                User.objects.filter(pk=item.pk).update(
+                    followers_count=Greatest(
+                        F('followers_count') - delete_cnt, 0))
 
         if delete_cnt:
             return Response(SUBSCRIBE_SUCCESS_MESSAGE,
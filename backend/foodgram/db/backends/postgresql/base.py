@@ -0,0 +1,86 @@
+import queue
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """ PostgreSQL с пулом соединений в процессе и проверкой соединений.
+
+    POOL_SIZE - сколько простаивающих соединений держать для повторного
+    использования, 0 отключает пул. HEALTH_CHECKS - проверять
+    переиспользуемое соединение один раз за запрос перед первым
+    обращением.
+    """
+    pools = {}
+    pools_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def pool_size(self):
+        return self.settings_dict.get('POOL_SIZE', 0)
+
+    def get_pool(self):
+        with self.pools_lock:
+            return self.pools.setdefault(
+                self.alias, queue.LifoQueue(maxsize=self.pool_size))
+
+    def get_new_connection(self, conn_params):
+        if self.pool_size:
+            pool = self.get_pool()
+
+            while True:
+                try:
+                    connection, isolation_level = pool.get_nowait()
+                except queue.Empty:
+                    break
+
+                if self.is_connection_usable(connection):
+                    self.isolation_level = isolation_level
+                    return connection
+
+                connection.close()
+
+        return super().get_new_connection(conn_params)
+
+    def _close(self):
+        if (self.connection is not None and self.pool_size
+                and not self.connection.closed
+                and self.connection.get_transaction_status()
+                == TRANSACTION_STATUS_IDLE):
+            try:
+                self.get_pool().put_nowait(
+                    (self.connection, self.isolation_level))
+                return None
+            except queue.Full:
+                pass
+
+        return super()._close()
+
+    @staticmethod
+    def is_connection_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def ensure_connection(self):
+        if (self.connection is not None
+                and self.settings_dict.get('HEALTH_CHECKS')
+                and not self.health_check_done
+                and not self.in_atomic_block):
+            if not self.is_usable():
+                self.close()
+            self.health_check_done = True
+
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
@@ -0,0 +1,20 @@
+class CounterFieldsMixin:
+    """ save() существующего объекта не перезаписывает счетчики.
+
+    Счетчики меняются только запросами с F(), а объект в памяти может
+    хранить устаревшие значения: загружен в начале запроса или взят из
+    кэша токенов. Поэтому без явного update_fields сохраняются все поля,
+    кроме перечисленных в counter_fields.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not args and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')
+                and not self._state.adding):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields]
+
+        super().save(*args, **kwargs)
@@ -0,0 +1,98 @@
+from django.db import connections, models, router
+
+
+def insert_or_ignore(model, **fields):
+    """ Создаёт объект одним INSERT ... ON CONFLICT DO NOTHING.
+
+    Возвращает созданный объект или None, если такая строка уже есть
+    и запись нарушила бы ограничение уникальности. На базах без
+    ON CONFLICT используется get_or_create.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    instance = model(**fields)
+
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        instance, created = model.objects.using(using).get_or_create(
+            **fields)
+        return instance if created else None
+
+    opts = model._meta
+    model_fields = [opts.get_field(name) for name in fields]
+    quote_name = connection.ops.quote_name
+
+    sql = 'INSERT INTO {} ({}) VALUES ({}) ON CONFLICT DO NOTHING'.format(
+        quote_name(opts.db_table),
+        ', '.join(quote_name(field.column) for field in model_fields),
+        ', '.join(['%s'] * len(model_fields)))
+    params = [field.get_db_prep_save(getattr(instance, field.attname),
+                                     connection)
+              for field in model_fields]
+
+    if connection.vendor == 'postgresql':
+        sql += f' RETURNING {quote_name(opts.pk.column)}'
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+        if cursor.rowcount != 1:
+            return None
+
+        instance.pk = (cursor.fetchone()[0]
+                       if connection.vendor == 'postgresql'
+                       else cursor.lastrowid)
+
+    instance._state.adding = False
+    instance._state.db = using
+    return instance
+
+
+def insert_or_increment(model, unique_fields, field, rows, batch_size=500):
+    """ Добавляет value к полю field или создаёт строку, если её нет.
+
+    rows - словари со значениями unique_fields и field. На PostgreSQL и
+    SQLite каждая пачка строк применяется одним
+    INSERT ... ON CONFLICT DO UPDATE.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    rows = list(rows)
+
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        for row in rows:
+            lookup = {name: row[name] for name in unique_fields}
+            instance, created = model.objects.using(using).get_or_create(
+                defaults={field: row[field]}, **lookup)
+            if not created:
+                model.objects.using(using).filter(pk=instance.pk).update(
+                    **{field: models.F(field) + row[field]})
+        return
+
+    opts = model._meta
+    model_fields = [opts.get_field(name)
+                    for name in (*unique_fields, field)]
+    quote_name = connection.ops.quote_name
+    table = quote_name(opts.db_table)
+    column = quote_name(model_fields[-1].column)
+    placeholder = '({})'.format(', '.join(['%s'] * len(model_fields)))
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        sql = (
+            'INSERT INTO {table} ({columns}) VALUES {values} '
+            'ON CONFLICT ({conflict}) DO UPDATE '
+            'SET {column} = {table}.{column} + EXCLUDED.{column}'
+        ).format(
+            table=table,
+            columns=', '.join(quote_name(model_field.column)
+                              for model_field in model_fields),
+            values=', '.join([placeholder] * len(batch)),
+            conflict=', '.join(quote_name(model_field.column)
+                               for model_field in model_fields[:-1]),
+            column=column)
+        params = [
+            model_field.get_db_prep_save(row[model_field.name], connection)
+            for row in batch for model_field in model_fields]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
@@ -0,0 +1,88 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signing import BadSignature
+
+DEFAULT_DB_ALIAS = 'default'
+PRIMARY_PIN_COOKIE = 'db_primary_pin'
+PRIMARY_PIN_SALT = 'foodgram.db_router.primary_pin'
+
+request_routing = ContextVar('request_routing', default=None)
+
+
+class RequestRouting:
+    """ Маршрутизация запросов к базам данных в рамках одного запроса.
+
+    replica - реплика, выбранная для чтения, или None, если запрос
+    читает с основной базы. pinned - пользователь недавно писал в базу
+    и закреплён за основной базой. databases - алиасы баз, к которым
+    обращался запрос.
+    """
+
+    def __init__(self):
+        self.replica = None
+        self.pinned = False
+        self.databases = set()
+
+    @property
+    def route(self):
+        if self.pinned:
+            return 'primary-pinned'
+        return 'replica' if self.replica else 'primary'
+
+
+def get_request_routing():
+    return request_routing.get()
+
+
+def pin_to_primary(response, user):
+    """ Закрепляет чтение пользователя за основной базой.
+
+    Метка хранится в подписанной cookie у клиента, поэтому её видят все
+    воркеры и процессы, а не только тот, что обработал запись.
+    """
+    response.set_signed_cookie(
+        PRIMARY_PIN_COOKIE, str(user.pk), salt=PRIMARY_PIN_SALT,
+        max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+        httponly=True, samesite='Lax')
+
+
+def is_pinned_to_primary(request, user):
+    try:
+        value = request.get_signed_cookie(
+            PRIMARY_PIN_COOKIE, salt=PRIMARY_PIN_SALT,
+            max_age=settings.DATABASE_REPLICA_STICKY_SECONDS)
+    except (KeyError, BadSignature):
+        return False
+    return value == str(user.pk)
+
+
+def choose_replica():
+    if not settings.DATABASE_REPLICAS:
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    """ Отправляет чтение на реплику, выбранную для текущего запроса. """
+
+    def db_for_read(self, model, **hints):
+        routing = request_routing.get()
+
+        if routing is None:
+            return DEFAULT_DB_ALIAS
+
+        alias = routing.replica or DEFAULT_DB_ALIAS
+        routing.databases.add(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        routing = request_routing.get()
+
+        if routing is not None:
+            routing.databases.add(DEFAULT_DB_ALIAS)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+request_metrics = ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """ Эндпоинт выполнил больше запросов к базе, чем разрешено. """
+
+
+class RequestMetrics:
+    """ Метрики одного запроса к API, время в миллисекундах. """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.db_time += (time.perf_counter() - started) * 1000
+
+    def finish(self):
+        self.total_time = (time.perf_counter() - self.started) * 1000
+
+
+@contextmanager
+def serializer_timing():
+    """ Учитывает время сериализации, вложенные вызовы не суммируются. """
+    metrics = request_metrics.get()
+
+    if metrics is None or metrics.serializer_depth:
+        yield
+        return
+
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_depth -= 1
+        metrics.serializer_time += (time.perf_counter() - started) * 1000
+
+
+class ViewStats:
+    """ Накопленные метрики по представлениям и действиям. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.stats = defaultdict(lambda: {
+            'requests': 0,
+            'queries': 0,
+            'max_queries': 0,
+            'db_time': 0.0,
+            'serializer_time': 0.0,
+            'total_time': 0.0,
+        })
+
+    def add(self, metrics):
+        """ Учитывает запрос и возвращает общее число учтенных запросов. """
+        with self.lock:
+            self.requests += 1
+            stats = self.stats[metrics.view]
+            stats['requests'] += 1
+            stats['queries'] += metrics.query_count
+            stats['max_queries'] = max(
+                stats['max_queries'], metrics.query_count)
+            stats['db_time'] += metrics.db_time
+            stats['serializer_time'] += metrics.serializer_time
+            stats['total_time'] += metrics.total_time
+            return self.requests
+
+    def snapshot(self):
+        with self.lock:
+            return {view: dict(stats) for view, stats in self.stats.items()}
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.stats.clear()
+
+
+view_stats = ViewStats()
+
+
+def get_view_name(request):
+    """ Имя в виде Вьюсет.действие, например RecipeViewSet.list. """
+    match = request.resolver_match
+
+    if match is None:
+        return request.path
+
+    view_class = getattr(match.func, 'cls', None)
+
+    if view_class is None:
+        return match.view_name
+
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class InstrumentationMiddleware:
+    """ Число SQL-запросов, время базы, сериализации и ответа для /api/.
+
+    Метрики отдаются в заголовке Server-Timing, пишутся в лог одной
+    JSON-строкой на уровне DEBUG и накапливаются в view_stats, сводка
+    которого пишется в лог каждые API_VIEW_STATS_INTERVAL запросов.
+    В режиме API_QUERY_BUDGET_MODE = 'raise' превышение API_QUERY_BUDGETS
+    приводит к исключению, чтобы тесты падали.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Как в MiddlewareMixin: под ASGI цепочка остаётся асинхронной.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        if not self.is_instrumented(request):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+
+        return self.process_response(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.is_instrumented(request):
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+
+        try:
+            with ExitStack() as stack:
+                # Соединения привязаны к потоку, в котором Django выполняет
+                # синхронный код запроса, поэтому обёртки ставятся там же.
+                await sync_to_async(self.wrap_connections)(stack, metrics)
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    await sync_to_async(stack.close)()
+        finally:
+            request_metrics.reset(token)
+
+        return self.process_response(request, response, metrics)
+
+    @staticmethod
+    def is_instrumented(request):
+        return (settings.API_INSTRUMENTATION
+                and request.path.startswith('/api/'))
+
+    @staticmethod
+    def wrap_connections(stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def process_response(self, request, response, metrics):
+        metrics.finish()
+        metrics.view = get_view_name(request)
+
+        if view_stats.add(metrics) % settings.API_VIEW_STATS_INTERVAL == 0:
+            logger.info('Метрики API: %s', json.dumps(
+                view_stats.snapshot(), ensure_ascii=False))
+
+        response['Server-Timing'] = self.get_server_timing(metrics)
+        self.log(request, response, metrics)
+        self.check_budget(metrics)
+        return response
+
+    @staticmethod
+    def get_server_timing(metrics):
+        return ', '.join((
+            f'db;dur={metrics.db_time:.2f};'
+            f'desc="{metrics.query_count} queries"',
+            f'serializer;dur={metrics.serializer_time:.2f}',
+            f'total;dur={metrics.total_time:.2f}',
+        ))
+
+    @staticmethod
+    def log(request, response, metrics):
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+
+        routing = getattr(request, 'db_routing', None)
+        logger.debug(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': metrics.view,
+            'status': response.status_code,
+            'queries': metrics.query_count,
+            'db_ms': round(metrics.db_time, 2),
+            'serializer_ms': round(metrics.serializer_time, 2),
+            'total_ms': round(metrics.total_time, 2),
+            'db_route': routing.route if routing else None,
+        }))
+
+    @staticmethod
+    def check_budget(metrics):
+        mode = settings.API_QUERY_BUDGET_MODE
+        budget = settings.API_QUERY_BUDGETS.get(metrics.view)
+
+        if mode == 'off' or budget is None or metrics.query_count <= budget:
+            return
+
+        message = (f'{metrics.view}: {metrics.query_count} '
+                   f'SQL-запросов при бюджете {budget}.')
+
+        if mode == 'raise':
+            raise QueryBudgetExceeded(message)
+
+        logger.warning(message)
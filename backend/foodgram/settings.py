@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from django.core.management.utils import get_random_secret_key
@@ -35,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +65,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
 
 if os.getenv('USE_SQLITE', '') == 'True':
 
@@ -72,17 +77,103 @@ if os.getenv('USE_SQLITE', '') == 'True':
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+    REPLICA_SETTING = 'NAME'
 else:
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.postgresql',
+            'ENGINE': 'foodgram.db.backends.postgresql',
             'NAME': os.getenv('POSTGRES_DB', 'django'),
             'USER': os.getenv('POSTGRES_USER', 'django'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
             'HOST': os.getenv('DB_HOST', ''),
             'PORT': os.getenv('DB_PORT', 5432),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 0)),
+            'HEALTH_CHECKS': os.getenv('DB_HEALTH_CHECKS', 'True') == 'True',
         }
     }
+    REPLICA_SETTING = 'HOST'
+
+DATABASE_REPLICAS = []
+
+for index, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        REPLICA_SETTING: replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+API_INSTRUMENTATION = os.getenv('API_INSTRUMENTATION', 'True') == 'True'
+
+# off - не проверять, warn - предупреждение в лог, raise - исключение.
+API_QUERY_BUDGET_MODE = os.getenv('API_QUERY_BUDGET_MODE', 'off')
+
+API_QUERY_BUDGETS = {
+    'TagViewSet.list': 2,
+    'TagViewSet.retrieve': 2,
+    'IngredientViewSet.list': 2,
+    'IngredientViewSet.retrieve': 2,
+    'RecipeViewSet.list': 6,
+    'RecipeViewSet.retrieve': 5,
+    'UserViewSet.subscriptions': 4,
+}
+
+# Каждые N запросов сводка view_stats пишется в лог одной строкой.
+API_VIEW_STATS_INTERVAL = 1000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.instrumentation': {
+            'handlers': ['console'],
+            'level': os.getenv('API_INSTRUMENTATION_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'api.authentication': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+DATABASE_REPLICA_STICKY_SECONDS = int(
+    os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    },
+    # Версии справочников должны быть видны всем процессам, включая
+    # manage.py load_data и воркеры gunicorn.
+    'references': {
+        'BACKEND': os.getenv(
+            'REFERENCE_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv(
+            'REFERENCE_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodgram_references')),
+    },
+}
+
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+
+RECIPE_SEARCH_CONFIG = os.getenv('RECIPE_SEARCH_CONFIG', 'russian')
+
+INGREDIENT_PREFIX_INDEX = os.getenv('INGREDIENT_PREFIX_INDEX', '') == 'True'
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -118,6 +209,13 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'backend_static', 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', 7 * 1024 * 1024))
+RECIPE_IMAGE_MAX_DIMENSIONS = (8000, 8000)
+
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', 2))
+IMAGE_RENDITION_QUALITY = 85
+
 AUTH_USER_MODEL = 'users.CustomUser'
 
 
@@ -143,8 +241,49 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 }
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 300))
+# Общий для воркеров кэш: выход из системы виден всем процессам.
+CACHES['tokens'] = {
+    'BACKEND': os.getenv(
+        'TOKEN_CACHE_BACKEND',
+        'django.core.cache.backends.filebased.FileBasedCache'),
+    'LOCATION': os.getenv(
+        'TOKEN_CACHE_LOCATION',
+        os.path.join(tempfile.gettempdir(), 'foodgram_tokens')),
+    'OPTIONS': {'MAX_ENTRIES': TOKEN_CACHE_SIZE},
+}
+# Алиас из CACHES для кэша токенов, пусто - кэш в памяти процесса.
+# При нескольких воркерах по умолчанию используется общий кэш.
+TOKEN_CACHE_ALIAS = os.getenv(
+    'TOKEN_CACHE_ALIAS',
+    'tokens' if int(os.getenv('GUNICORN_WORKERS', 1)) > 1 else '')
+TOKEN_CACHE_STATS_INTERVAL = 1000
+
+
+SHOPPING_LIST_RENDERERS = [
+    'api.renderers.TxtShoppingListRenderer',
+    'api.renderers.CsvShoppingListRenderer',
+    'api.renderers.JsonShoppingListRenderer',
+    'api.renderers.PdfShoppingListRenderer',
+]
+
+SHOPPING_LIST_EXPORT_THRESHOLD = int(
+    os.getenv('SHOPPING_LIST_EXPORT_THRESHOLD', 200))
+SHOPPING_LIST_EXPORT_WORKERS = int(
+    os.getenv('SHOPPING_LIST_EXPORT_WORKERS', 2))
+# Должен быть меньше GUNICORN_TIMEOUT, иначе воркер будет убит раньше.
+SHOPPING_LIST_EXPORT_TIMEOUT = int(
+    os.getenv('SHOPPING_LIST_EXPORT_TIMEOUT', 20))
+SHOPPING_LIST_EXPORT_RETRY_AFTER = 30
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
@@ -1,31 +1,118 @@
+from itertools import islice
+
 from django.contrib import admin
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
+from import_export.instance_loaders import ModelInstanceLoader
 
+from users.admin_utils import AutocompleteFilter, LargeTableAdminMixin
+from .counters import CounterAdminMixin
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     RecipeTag, ShoppingCart, Tag)
 
 admin.site.empty_value_display = '-пусто-'
 
 
-class TagResource(resources.ModelResource):
+IMPORT_LOOKUP_CHUNK_SIZE = 1000
+
+
+class BulkInstanceLoader(ModelInstanceLoader):
+    """ Загружает существующие объекты по import_id_fields пачками.
+
+    Вместо запроса на каждую строку выбирает кандидатов по первому
+    ключевому полю через IN и сопоставляет полный ключ в памяти.
+    Из набора данных читается только столбец этого поля, но сам файл
+    django-import-export целиком загружает в tablib.Dataset, поэтому
+    очень большие справочники лучше грузить командой load_data.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key_fields = [self.resource.fields[key]
+                           for key in self.resource.get_import_id_fields()]
+        self.instances = {}
+
+        headers = self.dataset.headers or ()
+        if not self.dataset.height or any(
+                field.column_name not in headers
+                for field in self.key_fields):
+            return
+
+        lookup_field = self.key_fields[0]
+        column_name = lookup_field.column_name
+        values = iter({lookup_field.clean({column_name: value})
+                       for value in self.dataset[column_name]})
+
+        while chunk := list(islice(values, IMPORT_LOOKUP_CHUNK_SIZE)):
+            for instance in self.get_queryset().filter(
+                    **{f'{lookup_field.attribute}__in': chunk}):
+                self.instances[self.get_instance_key(instance)] = instance
+
+    def get_instance_key(self, instance):
+        return tuple(field.get_value(instance) for field in self.key_fields)
+
+    def get_instance(self, row):
+        return self.instances.get(
+            tuple(field.clean(row) for field in self.key_fields))
+
+
+class BulkModelResource(resources.ModelResource):
+    """ Ресурс с массовым импортом и экспортом для больших справочников. """
+
+    class Meta:
+        use_bulk = True
+        batch_size = 1000
+        chunk_size = 2000
+        skip_unchanged = True
+        instance_loader_class = BulkInstanceLoader
+
+    def get_import_fields(self):
+        # id из файла другой базы не совпадает с локальным: строки
+        # сопоставляются по import_id_fields, а первичный ключ не трогается.
+        # Иначе неизмененные строки считались бы обновленными.
+        pk_name = self._meta.model._meta.pk.name
+        if pk_name in self.get_import_id_fields():
+            return super().get_import_fields()
+
+        return [field for field in super().get_import_fields()
+                if field.attribute != pk_name]
+
+    def get_bulk_update_fields(self):
+        pk_name = self._meta.model._meta.pk.name
+        return [field for field in super().get_bulk_update_fields()
+                if field != pk_name]
+
+    def bulk_update(self, *args, **kwargs):
+        # Если все поля ресурса ключевые, обновлять нечего, а
+        # bulk_update() с пустым списком полей падает с ValueError.
+        if not self.get_bulk_update_fields():
+            self.update_instances.clear()
+            return
+        super().bulk_update(*args, **kwargs)
+
+
+class TagResource(BulkModelResource):
     """ Ресурс для экспорта и импорта тегов. """
     class Meta:
         model = Tag
+        import_id_fields = ('slug',)
 
 
 @admin.register(Tag)
 class TagAdmin(ImportExportModelAdmin):
     """ Админ-зона тегов. """
+    resource_classes = [TagResource]
     list_display = ('name', 'color', 'slug')
     search_fields = ('name', 'color', 'slug')
     list_filter = ('name', 'color', 'slug')
 
 
-class IngredientResource(resources.ModelResource):
+class IngredientResource(BulkModelResource):
     """Ресурс для экспорта и импорта ингридиентов."""
     class Meta:
         model = Ingredient
+        fields = ('id', 'name', 'measurement_unit')
+        import_id_fields = ('name', 'measurement_unit')
 
 
 @admin.register(Ingredient)
@@ -43,18 +130,31 @@ class RecipeIngredientInline(admin.TabularInline):
     min_num = 1
 
 
+class RecipeTagInline(admin.TabularInline):
+    model = RecipeTag
+    extra = 1
+    min_num = 1
+
+
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(CounterAdminMixin, LargeTableAdminMixin,
+                  admin.ModelAdmin):
     ''' Админ-зона рецептов. '''
     list_display = ('name', 'author', 'cooking_time',
-                    'tags_list', 'ingredients_list', 'pub_date')
-    search_fields = ('name', 'author', 'tags__name')
-    list_filter = ('name', 'author', 'cooking_time', 'tags')
+                    'tags_list', 'ingredients_list', 'favorites_count',
+                    'pub_date')
+    search_fields = ('name', 'author__username', 'tags__name')
+    list_filter = (('author', AutocompleteFilter), 'tags')
     filter_horizontal = ('ingredients',)
     inlines = (
         RecipeIngredientInline,
+        RecipeTagInline,
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author').prefetch_related('tags', 'ingredients')
+
     def tags_list(self, obj):
         return ', '.join([tag.name for tag in obj.tags.all()])
     tags_list.short_description = 'Тэги'
@@ -67,24 +167,32 @@ class RecipeAdmin(admin.ModelAdmin):
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     ''' Админ-зона ингридиентов используемых в блюдах.  '''
     list_display = ('recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
     search_fields = ('recipe__name', 'ingredient__name__icontains',)
-    list_filter = ('recipe', 'ingredient')
+    list_filter = (('recipe', AutocompleteFilter),
+                   ('ingredient', AutocompleteFilter))
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(CounterAdminMixin, LargeTableAdminMixin,
+                        admin.ModelAdmin):
     ''' Админ-зона карточки с покупками.  '''
     list_display = ('customer', 'recipe')
-    search_fields = ('customer', 'recipe')
-    list_filter = ('customer', 'recipe')
+    list_select_related = ('customer', 'recipe')
+    search_fields = ('customer__username', 'recipe__name')
+    list_filter = (('customer', AutocompleteFilter),
+                   ('recipe', AutocompleteFilter))
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(CounterAdminMixin, LargeTableAdminMixin,
+                    admin.ModelAdmin):
     ''' Админ-зона любымых рецептов. '''
     list_display = ('customer', 'recipe')
-    search_fields = ('customer', 'recipe')
-    list_filter = ('customer', 'recipe')
+    list_select_related = ('customer', 'recipe')
+    search_fields = ('customer__username', 'recipe__name')
+    list_filter = (('customer', AutocompleteFilter),
+                   ('recipe', AutocompleteFilter))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.cache import caches
+
+
+def get_version_cache():
+    """ Общий для всех процессов кэш версий справочников. """
+    return caches['references']
+
+
+def get_reference_version_key(model):
+    return f'reference_version:{model._meta.label_lower}'
+
+
+def get_reference_version(model):
+    """ Версия справочника - время его последнего изменения. """
+    cache = get_version_cache()
+    key = get_reference_version_key(model)
+    version = cache.get(key)
+
+    if version is None:
+        version = int(time.time())
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+
+    return version
+
+
+def bump_reference_version(model):
+    """ Сбрасывает кэш справочника, меняя его версию. """
+    key = get_reference_version_key(model)
+    version = max(int(time.time()), get_reference_version(model) + 1)
+    get_version_cache().set(key, version, None)
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Follow
+from .models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+# Считаемая модель: (модель со счетчиком, поле связи, поле счетчика).
+COUNTERS = {
+    Favorite: (Recipe, 'recipe', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe', 'shopping_carts_count'),
+    Follow: (User, 'following', 'followers_count'),
+    Recipe: (User, 'author', 'recipes_count'),
+}
+
+
+def count_subquery(queryset, field):
+    """ Количество связанных строк для OuterRef('pk') одним подзапросом. """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField()),
+        0)
+
+
+def recount(model, target_ids):
+    """ Пересчитывает счетчик модели model у указанных объектов. """
+    target_model, field, counter_field = COUNTERS[model]
+    target_ids = {pk for pk in target_ids if pk is not None}
+
+    if target_ids:
+        target_model.objects.filter(pk__in=target_ids).update(
+            **{counter_field: count_subquery(model.objects, field)})
+
+
+class CounterAdminMixin:
+    """ Пересчитывает счетчики после изменений через админку.
+
+    API обновляет счетчики сам, а создание, изменение и удаление в
+    админке пересчитывают их у затронутых объектов.
+    """
+
+    def get_counter_attname(self):
+        _, field, _ = COUNTERS[self.model]
+        return self.model._meta.get_field(field).attname
+
+    def save_model(self, request, obj, form, change):
+        attname = self.get_counter_attname()
+        old_ids = set(
+            self.model.objects.filter(pk=obj.pk).values_list(
+                attname, flat=True)) if change else set()
+        super().save_model(request, obj, form, change)
+        recount(self.model, old_ids | {getattr(obj, attname)})
+
+    def delete_model(self, request, obj):
+        target_id = getattr(obj, self.get_counter_attname())
+        super().delete_model(request, obj)
+        recount(self.model, {target_id})
+
+    def delete_queryset(self, request, queryset):
+        target_ids = set(queryset.values_list(
+            self.get_counter_attname(), flat=True))
+        super().delete_queryset(request, queryset)
+        recount(self.model, target_ids)
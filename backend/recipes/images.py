@@ -0,0 +1,92 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from api.constants import RECIPE_IMAGE_FORMATS, RECIPE_IMAGE_RENDITIONS
+
+logger = logging.getLogger(__name__)
+
+rendition_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS)
+
+
+def render_image(image, size, image_format):
+    """ Уменьшенная копия изображения без метаданных. """
+    rendition = image.copy()
+    rendition.thumbnail(size, Image.LANCZOS)
+
+    if image_format == 'JPEG':
+        rendition = rendition.convert('RGB')
+
+    buffer = io.BytesIO()
+    rendition.save(buffer, format=image_format,
+                   quality=settings.IMAGE_RENDITION_QUALITY, optimize=True)
+
+    return buffer.getvalue()
+
+
+def generate_renditions(recipe_id, force=False):
+    """ Создает версии изображения рецепта, если оно изменилось. """
+    from .models import Recipe
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_renditions').first()
+
+    if recipe is None or not recipe.image:
+        return False
+
+    if not force and recipe.image_renditions.get(
+            'source') == recipe.image.name:
+        return False
+
+    with recipe.image.open('rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    renditions = {'source': recipe.image.name}
+
+    for name, size in RECIPE_IMAGE_RENDITIONS.items():
+        renditions[name] = {}
+
+        for extension, image_format in RECIPE_IMAGE_FORMATS.items():
+            path = f'renditions/{recipe_id}/{name}.{extension}'
+            default_storage.delete(path)
+            renditions[name][extension] = default_storage.save(
+                path, ContentFile(render_image(image, size, image_format)))
+
+    Recipe.objects.filter(pk=recipe_id, image=recipe.image.name).update(
+        image_renditions=renditions)
+
+    return True
+
+
+def run_generate_renditions(recipe_id, force=False):
+    """ Обработка в потоке пула, ошибка одного рецепта только логируется.
+
+    Возвращает результат generate_renditions или None при ошибке.
+    """
+    close_old_connections()
+    try:
+        return generate_renditions(recipe_id, force=force)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s.',
+                         recipe_id)
+        return None
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe_id, using='default'):
+    """ Отправляет обработку изображения в пул после коммита. """
+    transaction.on_commit(
+        lambda: rendition_executor.submit(run_generate_renditions, recipe_id),
+        using=using)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import rendition_executor, run_generate_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные версии изображений существующих рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать версии, даже если изображение не менялось.')
+
+    def handle(self, *args, **options):
+        recipe_ids = Recipe.objects.exclude(image='').values_list(
+            'pk', flat=True)
+
+        results = list(rendition_executor.map(
+            lambda recipe_id: run_generate_renditions(
+                recipe_id, force=options['force']),
+            recipe_ids.iterator()))
+        generated = results.count(True)
+        failed = results.count(None)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {generated}.'))
+
+        if failed:
+            self.stderr.write(self.style.ERROR(
+                f'Не удалось обработать изображений: {failed}, '
+                f'подробности в логе.'))
@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.cache import bump_reference_version
+from recipes.models import Ingredient, Tag
+
+MODELS = {
+    'ingredients': (Ingredient, ('name', 'measurement_unit')),
+    'tags': (Tag, ('name', 'color', 'slug')),
+}
+
+JSON_SEPARATORS = ' \t\r\n,[]'
+
+
+def iter_json(file, chunk_size):
+    """ Потоково читает объекты из JSON-массива верхнего уровня. """
+    decoder = json.JSONDecoder()
+    buffer = ''
+
+    for chunk in iter(lambda: file.read(chunk_size), ''):
+        buffer += chunk
+        position = 0
+
+        while True:
+            while (position < len(buffer)
+                   and buffer[position] in JSON_SEPARATORS):
+                position += 1
+
+            if position >= len(buffer):
+                break
+
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+
+            yield item
+
+        buffer = buffer[position:]
+
+    if buffer.strip(JSON_SEPARATORS):
+        raise CommandError('Некорректный JSON в конце файла.')
+
+
+def iter_csv(file, fields):
+    reader = csv.reader(file)
+    header = next(reader, None)
+
+    if header and set(header) >= set(fields):
+        yield from (dict(zip(header, row)) for row in reader)
+        return
+
+    if header:
+        yield dict(zip(fields, header))
+    yield from (dict(zip(fields, row)) for row in reader)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты или теги из JSON или CSV пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=MODELS.keys())
+        parser.add_argument(
+            '--path', required=True,
+            help='Путь к файлу JSON или CSV, например /data/tags.json.')
+        parser.add_argument('--format', choices=('json', 'csv'))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--chunk-size', type=int, default=64 * 1024)
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Использовать COPY на PostgreSQL.')
+
+    def handle(self, *args, **options):
+        model, fields = MODELS[options['model']]
+        path = Path(options['path'])
+
+        if not path.is_file():
+            raise CommandError(f'Файл не найден: {path}.')
+
+        file_format = options['format'] or path.suffix.lstrip('.')
+
+        if file_format not in ('json', 'csv'):
+            raise CommandError(f'Неизвестный формат файла: {path}.')
+
+        use_copy = options['copy'] and connection.vendor == 'postgresql'
+        insert_batch = self.copy_batch if use_copy else self.bulk_batch
+
+        started = time.monotonic()
+        count_before = model.objects.count()
+        processed = 0
+
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = (iter_json(file, options['chunk_size'])
+                    if file_format == 'json' else iter_csv(file, fields))
+
+            for batch in batched(rows, options['batch_size']):
+                insert_batch(model, fields, batch)
+                processed += len(batch)
+
+        bump_reference_version(model)
+
+        elapsed = time.monotonic() - started or 1e-9
+        created = model.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {processed}, добавлено: {created} '
+            f'за {elapsed:.2f} с ({processed / elapsed:.0f} строк/с).'))
+
+    @staticmethod
+    def bulk_batch(model, fields, batch):
+        model.objects.bulk_create(
+            [model(**{field: row[field] for field in fields})
+             for row in batch],
+            ignore_conflicts=True)
+
+    @staticmethod
+    def copy_batch(model, fields, batch):
+        table = model._meta.db_table
+        columns = ', '.join(
+            connection.ops.quote_name(model._meta.get_field(field).column)
+            for field in fields)
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            [row[field] for field in fields] for row in batch)
+        buffer.seek(0)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE load_data ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA')
+            cursor.copy_expert(
+                f'COPY load_data ({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT {columns} FROM load_data ON CONFLICT DO NOTHING')
@@ -0,0 +1,65 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import get_shopping_list_totals
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает материализованные списки покупок по корзинам '
+            'или, с --check, только сравнивает их.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только найти расхождения, ничего не меняя.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк создавать за один запрос.')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            return self.check_lists()
+
+        with transaction.atomic():
+            ShoppingListItem.objects.all().delete()
+            totals = (
+                ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                                 total_amount=total_amount)
+                for user_id, ingredient_id, total_amount
+                in get_shopping_list_totals().iterator())
+            created = 0
+
+            while batch := list(islice(totals, options['batch_size'])):
+                ShoppingListItem.objects.bulk_create(batch)
+                created += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны, позиций: {created}.'))
+
+    def check_lists(self):
+        expected = {(user_id, ingredient_id): total_amount
+                    for user_id, ingredient_id, total_amount
+                    in get_shopping_list_totals().iterator()}
+        actual = dict(
+            ((user_id, ingredient_id), total_amount)
+            for user_id, ingredient_id, total_amount
+            in ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount').iterator())
+
+        mismatched = {key for key in expected.keys() | actual.keys()
+                      if expected.get(key) != actual.get(key)}
+
+        for user_id, ingredient_id in sorted(mismatched):
+            self.stdout.write(
+                f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'ожидалось {expected.get((user_id, ingredient_id), 0)}, '
+                f'в списке {actual.get((user_id, ingredient_id), 0)}.')
+
+        if mismatched:
+            raise CommandError(f'Расхождений: {len(mismatched)}.')
+
+        self.stdout.write(self.style.SUCCESS(
+            'Списки покупок совпадают с корзинами.'))
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import count_subquery
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики рецептов, избранного, корзин и подписок.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.update(
+            favorites_count=count_subquery(Favorite.objects, 'recipe'),
+            shopping_carts_count=count_subquery(
+                ShoppingCart.objects, 'recipe'),
+        )
+        users = User.objects.update(
+            recipes_count=count_subquery(Recipe.objects, 'author'),
+            followers_count=count_subquery(Follow.objects, 'following'),
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {recipes}, пользователей: {users}.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает поисковый индекс рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+
+        for start in range(0, len(recipe_ids), batch_size):
+            update_search_index(recipe_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {len(recipe_ids)}.'))
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+DEDUPLICATE_SQL = (
+    'DELETE FROM {table} WHERE id NOT IN ('
+    'SELECT MIN(id) FROM {table} GROUP BY customer_id, recipe_id)')
+
+
+class Migration(migrations.Migration):
+    """ Удаляет повторы избранного и корзин перед ограничениями.
+
+    Чистый SQL без моделей: сигналы и счетчики рецептов на этом шаге
+    еще не существуют в схеме. Счетчики пересчитывает recount_counters
+    после migrate.
+    """
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            DEDUPLICATE_SQL.format(table='recipes_favorite'),
+            migrations.RunSQL.noop),
+        migrations.RunSQL(
+            DEDUPLICATE_SQL.format(table='recipes_shoppingcart'),
+            migrations.RunSQL.noop),
+    ]
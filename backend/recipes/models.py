@@ -1,9 +1,14 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import RowNumber
 from django.core.validators import MinValueValidator, MaxValueValidator
 from colorfield.fields import ColorField
 
 from api.constants import MAX_MODEL_FIELD_LENGTH
+from foodgram.db.counters import CounterFieldsMixin
+from users.models import Follow
 
 User = get_user_model()
 
@@ -53,18 +58,85 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class SearchVectorIndex(GinIndex):
+    """ GIN-индекс на PostgreSQL, обычный индекс на остальных БД. """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return models.Index.create_sql(
+                self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using, **kwargs)
+
+
+class RecipeQuerySet(models.QuerySet):
+    """ Queryset рецептов с подготовкой данных для чтения. """
+
+    def with_user_flags(self, user):
+        """ Аннотирует избранное, корзину и подписку на автора. """
+        if not user.is_authenticated:
+            return self
+
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                customer=user, recipe=models.OuterRef('pk'))),
+            is_in_shopping_cart=models.Exists(ShoppingCart.objects.filter(
+                customer=user, recipe=models.OuterRef('pk'))),
+            author_is_subscribed=models.Exists(Follow.objects.filter(
+                user=user, following=models.OuterRef('author'))),
+        )
+
+    def for_read(self, user):
+        """ Рецепты со всеми связанными данными для сериализации. """
+        return self.select_related('author').prefetch_related(
+            models.Prefetch(
+                'tags',
+                queryset=Tag.objects.only('id', 'name', 'color', 'slug')),
+            models.Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient').only(
+                        'recipe', 'amount', 'ingredient__name',
+                        'ingredient__measurement_unit')),
+        ).with_user_flags(user)
+
+    def latest_by_authors(self, author_ids, limit):
+        """ Последние limit рецептов каждого автора одним запросом. """
+        if not author_ids:
+            return self.none()
+
+        ranked = self.filter(author_id__in=author_ids).order_by().only(
+            'id', 'author', 'name', 'image', 'image_renditions',
+            'cooking_time'
+        ).annotate(row_number=models.Window(
+            expression=RowNumber(),
+            partition_by=[models.F('author')],
+            order_by=[models.F('pub_date').desc(), models.F('id').desc()],
+        ))
+        sql, params = ranked.query.sql_with_params()
+
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE ranked.row_number <= %s '
+            f'ORDER BY ranked.row_number',
+            (*params, limit))
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     """ Модель рецептов. """
+    counter_fields = ('favorites_count', 'shopping_carts_count')
+
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, verbose_name='Автор рецепта')
 
     name = models.CharField(
         'Название рецепта', max_length=MAX_MODEL_FIELD_LENGTH, db_index=True)
     image = models.ImageField('Изображение блюда', upload_to='media/')
+    image_renditions = models.JSONField(
+        'Версии изображения', default=dict, editable=False)
     text = models.TextField('Описание рецепта')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
 
-    tags = models.ManyToManyField(Tag, verbose_name='Тег')
+    tags = models.ManyToManyField(
+        Tag, verbose_name='Тег', through='RecipeTag')
 
     ingredients = models.ManyToManyField(
         Ingredient, verbose_name='Ингридиенты', through='RecipeIngredient')
@@ -80,6 +152,16 @@ class Recipe(models.Model):
                 'Проще купить, чем столько готовить.')
         ])
 
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False)
+    shopping_carts_count = models.PositiveIntegerField(
+        'В списках покупок', default=0, editable=False)
+
+    search_vector = SearchVectorField(
+        'Поисковый вектор', null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
@@ -90,6 +172,14 @@ class Recipe(models.Model):
                 fields=('name', 'author'),
                 name='unique_recipes')
         ]
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'),
+            SearchVectorIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx')
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -124,23 +214,65 @@ class RecipeIngredient(models.Model):
         return f'{self.ingredient} -- {self.amount}'
 
 
+class RecipeTag(models.Model):
+    """ Теги рецепта. """
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='recipe_tags',
+        db_index=False)
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE,
+        verbose_name='Тег',
+        related_name='recipe_tags',
+        db_index=False)
+
+    class Meta:
+        db_table = 'recipes_recipe_tags'
+        verbose_name = 'Тег рецепта'
+        verbose_name_plural = 'Теги рецепта'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'tag'),
+                name='unique_recipe_tag')
+        ]
+        indexes = [
+            models.Index(fields=('tag', 'recipe'),
+                         name='recipe_tag_tag_recipe_idx')
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.recipe}: {self.tag}'
+
+
 class ShoppingCart(models.Model):
     """ Модель списка покупок. """
     customer = models.ForeignKey(
         User,
         related_name='shoppingcart',
         verbose_name='Покупатель',
-        on_delete=models.CASCADE)
+        on_delete=models.CASCADE,
+        db_index=False)
     recipe = models.ForeignKey(
         Recipe,
         related_name='shoppingcart',
         verbose_name='Рецепт блюда',
-        on_delete=models.CASCADE)
+        on_delete=models.CASCADE,
+        db_index=False)
 
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
         ordering = ('customer',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('customer', 'recipe'),
+                name='unique_shoppingcart_customer_recipe')
+        ]
+        indexes = [
+            models.Index(fields=('recipe', 'customer'),
+                         name='cart_recipe_customer_idx')
+        ]
 
     def __str__(self) -> str:
         return f'{self.recipe}'
@@ -152,17 +284,63 @@ class Favorite(models.Model):
         User,
         related_name='favorite',
         verbose_name='Покупатель',
-        on_delete=models.CASCADE)
+        on_delete=models.CASCADE,
+        db_index=False)
     recipe = models.ForeignKey(
         Recipe,
         related_name='favorite',
         verbose_name='Рецепт блюда',
-        on_delete=models.CASCADE)
+        on_delete=models.CASCADE,
+        db_index=False)
 
     class Meta:
         verbose_name = 'Любимые рецепты'
         verbose_name_plural = 'Любимые рецепты'
         ordering = ('customer',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('customer', 'recipe'),
+                name='unique_favorite_customer_recipe')
+        ]
+        indexes = [
+            models.Index(fields=('recipe', 'customer'),
+                         name='favorite_recipe_customer_idx')
+        ]
 
     def __str__(self) -> str:
         return f'{self.recipe}'
+
+
+class ShoppingListItem(models.Model):
+    """ Итоговое количество ингредиента в списке покупок пользователя.
+
+    Добавление в корзину и изменение рецепта через API применяются
+    инкрементально. Удаления и правки корзин и ингредиентов рецептов,
+    в том числе из админки, пересчитывают затронутые позиции сигналами.
+    Целиком список пересобирается командой rebuild_shopping_lists.
+    """
+    user = models.ForeignKey(
+        User,
+        related_name='shopping_list_items',
+        verbose_name='Покупатель',
+        on_delete=models.CASCADE,
+        db_index=False)
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE)
+    total_amount = models.IntegerField('Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        ordering = ('user',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item')
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.ingredient}: {self.total_amount}'
@@ -0,0 +1,61 @@
+import threading
+from bisect import bisect_left
+
+from .cache import get_reference_version
+from .models import Ingredient
+
+
+class IngredientPrefixIndex:
+    """ Отсортированный индекс названий ингредиентов в памяти процесса.
+
+    Строится при первом обращении и перестраивается, когда меняется
+    версия справочника ингредиентов.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.keys = []
+        self.ingredients = []
+
+    def build(self, version):
+        ingredients = sorted(
+            Ingredient.objects.values_list(
+                'name', 'id', 'measurement_unit').iterator(),
+            key=lambda row: (row[0].lower(), row[1]))
+
+        self.keys = [name.lower() for name, _, _ in ingredients]
+        self.ingredients = [
+            Ingredient(id=pk, name=name, measurement_unit=measurement_unit)
+            for name, pk, measurement_unit in ingredients
+        ]
+        self.version = version
+
+    def ensure_built(self):
+        version = get_reference_version(Ingredient)
+
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.build(version)
+
+    def search(self, query):
+        """ Сначала совпадения по началу названия, затем по подстроке. """
+        self.ensure_built()
+        query = query.lower()
+        keys, ingredients = self.keys, self.ingredients
+
+        start = end = bisect_left(keys, query)
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+
+        substring_matches = [
+            ingredient
+            for position, ingredient in enumerate(ingredients)
+            if not start <= position < end and query in keys[position]
+        ]
+
+        return ingredients[start:end] + substring_matches
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,130 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections, transaction
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+
+def create_fts_table(using):
+    """ Создает FTS5-таблицу поиска рецептов на SQLite. """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            f'USING fts5(name, text, ingredients)')
+
+
+def update_postgresql_search_index(recipe_ids, using):
+    from .models import Recipe, RecipeIngredient
+
+    config = settings.RECIPE_SEARCH_CONFIG
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(recipe=OuterRef('pk'))
+        .order_by().values('recipe')
+        .annotate(names=StringAgg('ingredient__name', delimiter=' '))
+        .values('names'))
+
+    Recipe.objects.using(using).filter(pk__in=recipe_ids).update(
+        search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector(Coalesce(ingredient_names, Value('')),
+                           weight='B', config=config)
+            + SearchVector('text', weight='C', config=config)))
+
+
+def update_sqlite_search_index(recipe_ids, using):
+    from .models import Recipe, RecipeIngredient
+
+    ingredient_names = defaultdict(list)
+    for recipe_id, name in RecipeIngredient.objects.using(using).filter(
+            recipe_id__in=recipe_ids).values_list(
+                'recipe_id', 'ingredient__name'):
+        ingredient_names[recipe_id].append(name)
+
+    rows = [
+        (pk, name, text, ' '.join(ingredient_names[pk]))
+        for pk, name, text in Recipe.objects.using(using).filter(
+            pk__in=recipe_ids).values_list('pk', 'name', 'text')
+    ]
+
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [(pk,) for pk in recipe_ids])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE}(rowid, name, text, ingredients) '
+            f'VALUES (%s, %s, %s, %s)', rows)
+
+
+def update_search_index(recipe_ids, using='default'):
+    """ Пересчитывает поисковый индекс для переданных рецептов. """
+    recipe_ids = list(recipe_ids)
+
+    if not recipe_ids:
+        return
+
+    vendor = connections[using].vendor
+
+    if vendor == 'postgresql':
+        update_postgresql_search_index(recipe_ids, using)
+    elif vendor == 'sqlite':
+        update_sqlite_search_index(recipe_ids, using)
+
+
+class SearchIndexUpdate:
+    """ Отложенное обновление индекса, общее для всей транзакции. """
+
+    def __init__(self, using):
+        self.using = using
+        self.recipe_ids = set()
+
+    def __call__(self):
+        update_search_index(self.recipe_ids, self.using)
+
+
+def schedule_search_index_update(recipe_ids, using='default'):
+    """ Обновляет индекс после коммита, когда ингредиенты уже записаны.
+
+    Все изменения в одной транзакции объединяются в одно обновление.
+    """
+    for callback in connections[using].run_on_commit:
+        if isinstance(callback[1], SearchIndexUpdate):
+            callback[1].recipe_ids.update(recipe_ids)
+            return
+
+    update = SearchIndexUpdate(using)
+    update.recipe_ids.update(recipe_ids)
+    transaction.on_commit(update, using=using)
+
+
+def search_recipes(queryset, value):
+    """ Полнотекстовый поиск рецептов с сортировкой по релевантности. """
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        query = SearchQuery(value, config=settings.RECIPE_SEARCH_CONFIG,
+                            search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-pub_date')
+
+    if vendor == 'sqlite':
+        terms = ' '.join(
+            '"{}"*'.format(term.replace('"', '""'))
+            for term in value.split())
+
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s ORDER BY rank', [terms])
+            recipe_ids = [row[0] for row in cursor.fetchall()]
+
+        return queryset.filter(pk__in=recipe_ids).order_by(
+            Case(*[When(pk=pk, then=position)
+                   for position, pk in enumerate(recipe_ids)]))
+
+    return queryset.filter(name__icontains=value)
@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Sum
+
+from foodgram.db.upsert import insert_or_increment
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def get_recipe_amounts(recipe):
+    """ Количество каждого ингредиента в рецепте. """
+    return dict(
+        RecipeIngredient.objects.filter(recipe=recipe)
+        .values_list('ingredient_id').annotate(amount=Sum('amount'))
+        .order_by())
+
+
+def apply_shopping_list_changes(changes):
+    """ Применяет изменения {(user_id, ingredient_id): delta} к спискам. """
+    changes = {key: delta for key, delta in changes.items() if delta}
+
+    if not changes:
+        return
+
+    insert_or_increment(
+        ShoppingListItem,
+        ('user', 'ingredient'),
+        'total_amount',
+        ({'user': user_id, 'ingredient': ingredient_id,
+          'total_amount': delta}
+         for (user_id, ingredient_id), delta in changes.items()))
+
+    if any(delta < 0 for delta in changes.values()):
+        ShoppingListItem.objects.filter(
+            user_id__in={user_id for user_id, _ in changes},
+            total_amount__lte=0).delete()
+
+
+def change_recipe_in_shopping_lists(user_ids, amounts):
+    changes = defaultdict(int)
+
+    for user_id in user_ids:
+        for ingredient_id, amount in amounts.items():
+            changes[user_id, ingredient_id] += amount
+
+    apply_shopping_list_changes(changes)
+
+
+def add_recipe_to_shopping_list(user, recipe):
+    change_recipe_in_shopping_lists((user.pk,), get_recipe_amounts(recipe))
+
+
+def get_recipe_customer_ids(recipe_id):
+    return list(ShoppingCart.objects.filter(recipe_id=recipe_id)
+                .values_list('customer_id', flat=True))
+
+
+def update_recipe_in_shopping_lists(recipe, deltas):
+    """ Переносит изменение ингредиентов рецепта в списки покупателей. """
+    if deltas:
+        change_recipe_in_shopping_lists(
+            get_recipe_customer_ids(recipe.pk), deltas)
+
+
+def get_shopping_list_totals(user_ids=None):
+    """ Суммы по корзинам, посчитанные заново по RecipeIngredient. """
+    if user_ids is None:
+        lookup = {'recipe__shoppingcart__isnull': False}
+    else:
+        lookup = {'recipe__shoppingcart__customer__in': user_ids}
+
+    return (RecipeIngredient.objects.filter(**lookup)
+            .values_list('recipe__shoppingcart__customer', 'ingredient')
+            .annotate(total_amount=Sum('amount'))
+            .order_by())
+
+
+def refresh_shopping_lists(user_ids, ingredient_ids=None):
+    """ Пересчитывает позиции списков заново по корзинам.
+
+    В отличие от инкрементальных изменений, результат не зависит от
+    порядка и числа вызовов, поэтому подходит для сигналов, в том числе
+    при каскадном удалении рецепта вместе с корзинами и ингредиентами.
+    """
+    user_ids = set(user_ids)
+
+    if not user_ids:
+        return
+
+    items = ShoppingListItem.objects.filter(user_id__in=user_ids)
+    totals = get_shopping_list_totals(user_ids)
+
+    if ingredient_ids is not None:
+        items = items.filter(ingredient_id__in=ingredient_ids)
+        totals = totals.filter(ingredient_id__in=ingredient_ids)
+
+    with transaction.atomic():
+        items.delete()
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                             total_amount=total_amount)
+            for user_id, ingredient_id, total_amount in totals)
@@ -0,0 +1,97 @@
+from django.db import connections
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from import_export.signals import post_import
+
+from .cache import bump_reference_version
+from .images import schedule_renditions
+from .models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+                     Tag)
+from .search import create_fts_table, schedule_search_index_update
+from .shopping_list import get_recipe_customer_ids, refresh_shopping_lists
+
+REFERENCE_MODELS = (Tag, Ingredient)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def reference_changed(sender, **kwargs):
+    bump_reference_version(sender)
+
+
+@receiver(post_import)
+def reference_imported(sender, model, **kwargs):
+    if model in REFERENCE_MODELS:
+        bump_reference_version(model)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, using, **kwargs):
+    schedule_search_index_update([instance.pk], using)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, using, **kwargs):
+    if instance.image and instance.image_renditions.get(
+            'source') != instance.image.name:
+        schedule_renditions(instance.pk, using)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, using, **kwargs):
+    schedule_search_index_update([instance.recipe_id], using)
+
+
+@receiver(pre_save, sender=ShoppingCart)
+@receiver(pre_save, sender=RecipeIngredient)
+def shopping_list_source_saving(sender, instance, **kwargs):
+    """ Запоминает прежнюю строку, чтобы пересчитать и старые списки. """
+    instance._previous = (
+        sender.objects.filter(pk=instance.pk).first()
+        if instance.pk else None)
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    user_ids = {instance.customer_id}
+
+    if previous is not None:
+        user_ids.add(previous.customer_id)
+
+    refresh_shopping_lists(user_ids)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_amount_changed(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    rows = {(instance.recipe_id, instance.ingredient_id)}
+
+    if previous is not None:
+        rows.add((previous.recipe_id, previous.ingredient_id))
+
+    for recipe_id, ingredient_id in rows:
+        refresh_shopping_lists(
+            get_recipe_customer_ids(recipe_id), (ingredient_id,))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, using, **kwargs):
+    if not created:
+        schedule_search_index_update(
+            Recipe.objects.using(using).filter(
+                ingredients=instance).values_list('pk', flat=True),
+            using)
+
+
+@receiver(post_migrate)
+def search_table_created(sender, using, **kwargs):
+    if sender.name == 'recipes' and connections[using].vendor == 'sqlite':
+        create_fts_table(using)
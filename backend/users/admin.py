@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from recipes.counters import CounterAdminMixin
+from .admin_utils import AutocompleteFilter, LargeTableAdminMixin
 from .forms import CustomUserChangeForm, CustomUserCreationForm
 from .models import CustomUser, Follow
 
@@ -8,14 +10,15 @@ admin.site.empty_value_display = '-пусто-'
 
 
 @admin.register(CustomUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
     """Админ-зона пользователей Django"""
     add_form = CustomUserCreationForm
     form = CustomUserChangeForm
     list_display = ('id', 'username', 'email', 'first_name',
-                    'last_name', 'admin_status', 'is_active',)
-    search_fields = ('username', 'email', 'is_active',)
-    list_filter = ('username', 'email', 'is_active',)
+                    'last_name', 'admin_status', 'recipes_count',
+                    'followers_count', 'is_active',)
+    search_fields = ('username', 'email',)
+    list_filter = ('is_staff', 'is_active',)
     list_editable = ('is_active',)
 
     add_fieldsets = (
@@ -38,11 +41,14 @@ class CustomUserAdmin(UserAdmin):
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(CounterAdminMixin, LargeTableAdminMixin,
+                  admin.ModelAdmin):
     """Админ-зона подписчиков. """
     list_display = ('user', 'following',)
+    list_select_related = ('user', 'following')
     search_fields = ('user__username', 'following__username',)
-    list_filter = ('user__username', 'following__username',)
+    list_filter = (('user', AutocompleteFilter),
+                   ('following', AutocompleteFilter))
 
     def user(self, obj):
         return obj.user.username
@@ -0,0 +1,99 @@
+import json
+
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.forms import Media
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Пагинатор с оценкой числа строк по плану запроса PostgreSQL.
+
+    COUNT(*) по большой таблице выполняется долго, поэтому число строк
+    берётся из EXPLAIN. Точный подсчёт выполняется только для небольших
+    выборок и на других базах данных.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+
+        if connection.vendor != 'postgresql':
+            return super().count
+
+        sql, params = queryset.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+
+        if estimate < self.exact_count_threshold:
+            return super().count
+
+        return estimate
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """ Фильтр по связанной модели с автодополнением.
+
+    В отличие от стандартного фильтра не перечисляет все значения в
+    боковой панели, а ищет их через autocomplete-представление админки.
+    У админ-зоны связанной модели должны быть заданы search_fields.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(
+            field, request, params, model, model_admin, field_path)
+
+        widget = AutocompleteSelect(field, model_admin.admin_site, attrs={
+            'class': 'admin-autocomplete-filter',
+            'data-width': '100%',
+        })
+        self.widget = field.formfield(widget=widget, required=False).widget
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        return ()
+
+    def rendered_widget(self):
+        return self.widget.render(self.lookup_kwarg, self.lookup_val)
+
+
+class LargeTableAdminMixin:
+    """ Настройки списка объектов для больших таблиц.
+
+    Не считает полное число строк, оценивает размер выборки и
+    подключает скрипты для фильтров с автодополнением.
+    """
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    @property
+    def media(self):
+        media = super().media
+
+        if any(isinstance(list_filter, tuple)
+               and issubclass(list_filter[1], AutocompleteFilter)
+               for list_filter in self.list_filter):
+            media += AutocompleteSelect(None, self.admin_site).media
+            media += Media(js=('users/js/autocomplete_filter.js',))
+
+        return media
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """ Удаляет повторные подписки перед ограничением уникальности. """
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'DELETE FROM users_follow WHERE id NOT IN ('
+            'SELECT MIN(id) FROM users_follow '
+            'GROUP BY user_id, following_id)',
+            migrations.RunSQL.noop),
+    ]
@@ -4,13 +4,15 @@ from django.contrib.auth.validators import UnicodeUsernameValidator
 
 from api.constants import (USERNAME_FIELD, REQUIRED_FIELDS,
                            MAX_USER_MODEL_FIELD_LENGTH)
+from foodgram.db.counters import CounterFieldsMixin
 
 
-class CustomUser(AbstractUser):
+class CustomUser(CounterFieldsMixin, AbstractUser):
     """ Кастомная модель пользователя. """
 
     USERNAME_FIELD = USERNAME_FIELD
     REQUIRED_FIELDS = REQUIRED_FIELDS
+    counter_fields = ('recipes_count', 'followers_count')
 
     username = models.CharField(
         'Логин',
@@ -32,6 +34,11 @@ class CustomUser(AbstractUser):
     last_name = models.CharField(
         'Фамилия', max_length=MAX_USER_MODEL_FIELD_LENGTH)
 
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False)
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -47,17 +54,29 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='follower',
         verbose_name='Пользователь',
+        db_index=False,
     )
     following = models.ForeignKey(
         CustomUser,
         on_delete=models.CASCADE,
         related_name='followings',
-        verbose_name='Подписан'
+        verbose_name='Подписан',
+        db_index=False,
     )
 
     class Meta:
         verbose_name = 'Подписчика'
         verbose_name_plural = 'Подписчики'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'following'),
+                name='unique_follow_user_following')
+        ]
+        indexes = [
+            models.Index(fields=('user', '-id'), name='follow_user_id_idx'),
+            models.Index(fields=('following', 'user'),
+                         name='follow_following_user_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user} подписан на {self.following}'
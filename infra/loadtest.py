@@ -0,0 +1,71 @@
+"""Нагрузочный тест API для сравнения режимов WSGI и ASGI.
+
+Пример:
+    SERVER_MODE=wsgi gunicorn --config gunicorn.conf.py
+    python infra/loadtest.py http://localhost:8000/api/tags/ \
+        http://localhost:8000/api/ingredients/?name=аб -c 32 -n 2000
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+
+def fetch(url, headers, timeout):
+    started = time.perf_counter()
+    try:
+        request = Request(quote(url, safe=':/?&=%'), headers=headers)
+        with urlopen(request, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except HTTPError as error:
+        status = error.code
+    except OSError:
+        status = None
+    return status, time.perf_counter() - started
+
+
+def percentile(values, percent):
+    index = max(0, round(len(values) * percent / 100) - 1)
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-n', '--requests', type=int, default=1000)
+    parser.add_argument('--token', help='Токен для заголовка Authorization.')
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+
+    headers = {'Accept': 'application/json'}
+    if args.token:
+        headers['Authorization'] = f'Token {args.token}'
+
+    urls = list(islice(cycle(args.urls), args.requests))
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(
+            lambda url: fetch(url, headers, args.timeout), urls))
+
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results
+                 if status is None or status >= 400)
+
+    print(f'Запросов: {len(results)}, ошибок: {errors}, '
+          f'параллельно: {args.concurrency}')
+    print(f'RPS: {len(results) / elapsed:.1f}')
+    print(f'Задержка, мс: p50 {statistics.median(latencies) * 1000:.1f}, '
+          f'p99 {percentile(latencies, 99) * 1000:.1f}, '
+          f'max {latencies[-1] * 1000:.1f}')
+
+
+if __name__ == '__main__':
+    main()